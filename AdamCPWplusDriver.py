@@ -5,22 +5,182 @@
 # Driver for Adam Equipment CPWplus floor scales connected via RS-232.
 # Designed for deployment to an Odoo IoT Box (Raspberry Pi).
 
+import asyncio
+import collections
+import contextlib
+import json
 import logging
-import re
+import os
 import serial
+import threading
 import time
+import traceback
+import weakref
 
+from odoo import http
 from odoo.addons.iot_drivers.event_manager import event_manager
 from odoo.addons.iot_drivers.iot_handlers.drivers.serial_base_driver import (
     SerialProtocol,
     serial_connection,
 )
 from odoo.addons.iot_drivers.iot_handlers.drivers.serial_scale_driver import ScaleDriver
+from odoo.addons.iot_drivers.iot_handlers.drivers.cpwplus_protocol import (
+    FRAME_NO_MATCH,
+    FRAME_OK,
+    FRAME_REGEXP,
+    FRAME_TIMEOUT,
+    AsyncFramePort,
+    ChangeFilter,
+    ConnectionManager,
+    NO_SNAPSHOT,
+    FrameReader,
+    LogSummary,
+    MetricsRegistry,
+    ParallelProber,
+    PollHub,
+    PollScheduler,
+    ProbeCache,
+    ReadingLeases,
+    WeightSnapshot,
+    looks_like_cpwplus,
+    parse_frame,
+    ports_open_in_process,
+    shared_event_loop,
+    wait_for_response,
+)
 
 _logger = logging.getLogger(__name__)
 
-CPW_MEASURE_REGEXP = rb"(?:[GN]/W\s*)?[+-]\s*([0-9.]+)\s+(?:lb|kg|oz)"
-CPW_SIGN_REGEXP = rb"(?:[GN]/W\s*)?(-)\s*[0-9.]"
+# Frames are parsed in one pass by cpwplus_protocol.parse_frame(); the
+# pattern is only recorded here for the SerialProtocol definition.
+CPW_MEASURE_REGEXP = FRAME_REGEXP.pattern
+
+# True: after sending G, wait on the port and parse as soon as the \r\n
+# terminator arrives, with measureDelay as the upper bound.  False: always
+# sleep the full measureDelay before reading (the original behavior).
+CPW_WAIT_FOR_READY = True
+
+# Must match the scale's transmission setting: 'demand' for trn 1 (the
+# driver polls with G), 'stream' for trn 2 (the scale transmits
+# continuously and a reader thread keeps the latest frame).
+CPW_TRANSMISSION_MODE = 'demand'
+# In stream mode, a reading older than this (seconds) is treated as stale
+CPW_STREAM_STALE_AFTER = 1.0
+
+# True: the serial I/O of every CPWplus runs as coroutines on one shared
+# asyncio loop (cpwplus_protocol.shared_event_loop), woken by add_reader on
+# each port's fd; the driver's own thread only waits for its coroutine to
+# end.  False: each driver thread does its own blocking I/O.
+CPW_ASYNC_IO = False
+
+# Hub mode, for one IoT Box serving several CPWplus units (implies
+# CPW_ASYNC_IO): instead of one polling coroutine per scale, a single
+# cpwplus_protocol.PollHub on the shared loop polls every scale in
+# round-robin, at most CPW_HUB_MAX_IN_FLIGHT at once, putting first any
+# scale whose poll is more than CPW_HUB_LATENCY_BUDGET seconds overdue.
+CPW_HUB_MODE = False
+CPW_HUB_MAX_IN_FLIGHT = 4
+CPW_HUB_LATENCY_BUDGET = 0.1
+
+# Per-scale counters and latency histograms (cpwplus_protocol.DeviceMetrics)
+# are served in the Prometheus text format on this IoT Box route
+CPW_METRICS_ROUTE = '/iot_drivers/cpwplus/metrics'
+
+# The last CPW_FRAME_LOG_SIZE raw frames of each scale, with their arrival
+# time and parse outcome, are kept in a preallocated ring
+# (cpwplus_protocol.FrameRing) for post-mortem checks.  They are returned
+# by the 'dump_frames' action and, for every scale, as JSON on this route
+CPW_FRAME_LOG_SIZE = 64
+CPW_FRAMES_ROUTE = '/iot_drivers/cpwplus/frames'
+
+# Recurring problems on the measurement and probing paths (unparsable
+# frames, ports that are not a CPWplus) are logged the first time, then
+# summarised with a count at most once per interval (seconds), so a scale
+# that is off or misconfigured does not flood the journal
+CPW_LOG_SUMMARY_INTERVAL = 60.0
+CPW_PROBE_LOG_SUMMARY_INTERVAL = 3600.0
+
+# After dropping DTR/RTS, wait at most this long (seconds) for the scale's
+# first valid response instead of always sleeping it out
+CPW_LINE_SETTLE_MAX = 0.5
+
+# When the IoT Box asks about one serial port, probe every other unclaimed
+# USB serial port at the same time, so discovery takes as long as the
+# slowest port instead of the sum of all of them
+CPW_PARALLEL_PROBING = True
+CPW_PROBE_WORKERS = 8
+
+# Remember probe results per USB adapter (VID:PID + serial number, or the
+# /dev/serial/by-id path) so rescans skip known devices.  None disables it.
+# On the IoT Box ~ (/home/pi) lives on a RAM disk: the file survives
+# service restarts and rescans, but not a reboot, so the boot scan always
+# probes.  Only /root_bypass_ramdisks persists, and it is mounted
+# read-only while Odoo runs (see deploy.sh), so it cannot be used here.
+CPW_PROBE_CACHE_FILE = os.path.expanduser('~/.cpwplus_probe_cache.json')
+CPW_PROBE_CACHE_TTL = 24 * 3600  # seconds a positive identification is trusted
+CPW_PROBE_CACHE_NEGATIVE_TTL = 300  # seconds a negative one is trusted
+# Consecutive unparsable frames after which the cached identification of
+# the connected adapter is dropped, so the next scan probes it again
+CPW_PROBE_CACHE_MAX_PARSE_FAILURES = 10
+
+# Filtering of measurement-loop events (see cpwplus_protocol.ChangeFilter):
+# changes smaller than the deadband (in scale units) are idle jitter and are
+# only published once they have held for the stability window (seconds);
+# at most CPW_EVENT_MAX_RATE events per second per scale (0 = unlimited).
+CPW_EVENT_DEADBAND = 0.02
+CPW_EVENT_STABILITY_WINDOW = 1.0
+CPW_EVENT_MAX_RATE = 5.0
+
+# read_stable action: answer with the first stable reading, or with an
+# error once CPW_READ_STABLE_TIMEOUT (seconds) has passed without one.
+# While a request is waiting the scale is polled every
+# CPW_READ_STABLE_INTERVAL seconds instead of every newMeasureDelay.
+CPW_READ_STABLE_TIMEOUT = 10.0
+CPW_READ_STABLE_INTERVAL = 0.05
+
+# read_once action: answered from the newest reading, without touching the
+# port, when it is stable and at most CPW_READ_ONCE_MAX_AGE seconds old.
+# POS may send its own 'max_age' (0 always measures).  Otherwise the scale
+# is measured once for every read_once that arrives while that is pending.
+CPW_READ_ONCE_MAX_AGE = 0.5
+# For firmware that sends no ST/US status: a reading counts as stable once
+# this many consecutive frames carried the same weight
+CPW_STABLE_FRAMES = 3
+
+# Adaptive polling (see cpwplus_protocol.PollScheduler): every
+# CPW_POLL_FAST seconds while the weight changes by CPW_EVENT_DEADBAND or
+# more, or for CPW_POLL_SESSION_HOLD seconds after a POS action;
+# newMeasureDelay once it holds still; backing off by CPW_POLL_BACKOFF per
+# poll up to CPW_POLL_IDLE while it holds still at zero (within
+# CPW_POLL_ZERO_BAND, which covers the idle jitter).
+CPW_POLL_FAST = 0.1
+CPW_POLL_IDLE = 2.0
+CPW_POLL_BACKOFF = 2.0
+CPW_POLL_ZERO_BAND = CPW_EVENT_DEADBAND
+CPW_POLL_SESSION_HOLD = 30.0
+
+# Demand-driven reading: start_reading gives the POS session a lease that
+# lasts until its stop_reading, or until CPW_READING_LEASE seconds after
+# any further action from the session or a published weight change last
+# renewed it, so a closed POS tab expires on its own (0: no time limit).
+# While a lease is live the scale is polled as during a POS action.  For
+# CPW_READING_LAPSE_HOLD seconds after a lease ran out (a weighing screen
+# left idle, or a closed tab) it is still polled at least every
+# newMeasureDelay, so the next weight change is not held up by the
+# heartbeat.  With no live lease and no action for CPW_POLL_SESSION_HOLD
+# seconds the scale is otherwise only polled every CPW_READING_HEARTBEAT
+# seconds (0: keep polling as above).
+CPW_READING_LEASE = 120.0
+CPW_READING_LAPSE_HOLD = 3600.0
+CPW_READING_HEARTBEAT = 10.0
+
+# Owner-aware events: measurement events go out at full rate only while a
+# POS session holds a reading lease, and carry that session as 'owner'
+# when it is the only one.  Otherwise nobody is watching the live weight,
+# so changes are coalesced into at most one event (the newest weight) per
+# CPW_UNOWNED_EVENT_INTERVAL seconds; stable flag changes wait their turn
+# too.  Action answers are not affected.  0 broadcasts every change.
+CPW_UNOWNED_EVENT_INTERVAL = 5.0
 
 CPWplusProtocol = SerialProtocol(
     name='Adam CPWplus',
@@ -40,31 +200,144 @@ CPWplusProtocol = SerialProtocol(
     emptyAnswerValid=False,
 )
 
+# trn 2: nothing to send, and _take_measure only reads the reader thread's
+# latest frame from memory, so it can check for changes more often.
+CPWplusStreamProtocol = CPWplusProtocol._replace(
+    measureCommand=b'',
+    newMeasureDelay=0.1,
+)
+
 
 class AdamCPWplusDriver(ScaleDriver):
     """Driver for Adam Equipment CPWplus series floor scales.
 
     Extends ScaleDriver with:
     - DTR/RTS flow control fix for FTDI USB-to-serial adapters
-    - Fast CR/LF-terminated serial reads
+    - Bulk, resynchronising CR/LF-terminated serial reads (see cpwplus_protocol.FrameReader)
     - Tare and zero commands
     - Action response with status:'success' for POS compatibility
+    - Continuous-stream (trn 2) mode via a background reader thread
+    - Non-blocking tare/zero via a command queue serviced by the I/O thread
+    - One long-lived connection per device, reopened with backoff on failure
+    - Deadband, stability window and rate cap on measurement events
+    - Stable/overload flags in self.data and a read_stable action
+    - Adaptive polling: fast while weighing, backing off when idle at zero
+    - Optional asyncio I/O on a loop shared by all scales (CPW_ASYNC_IO)
+    - Hub mode: one round-robin poller for every scale (CPW_HUB_MODE)
+    - Events sent from the driver's own thread, never from the shared loop
+    - Per-scale metrics, served on CPW_METRICS_ROUTE
+    - Ring of recent raw frames (dump_frames action, CPW_FRAMES_ROUTE)
+    - start_reading/stop_reading leases; a slow heartbeat when nobody reads
+    - Owner-aware events: full rate for the reading session, summaries otherwise
+    - Immutable weight snapshots readable without the serial lock (snapshot())
+    - read_once served from a fresh stable snapshot (max_age), else one shared poll
     """
 
-    _protocol = CPWplusProtocol
+    _protocol = CPWplusStreamProtocol if CPW_TRANSMISSION_MODE == 'stream' else CPWplusProtocol
     priority = 10
 
-    @staticmethod
-    def _disable_flow_control(connection):
+    # Actions queued for the I/O thread instead of run in the caller's
+    # thread: action name -> command sent to the scale
+    _queued_commands = {
+        'tare': b'T',
+        'zero': b'Z',
+    }
+
+    # Connections whose DTR/RTS we have already dropped
+    _flow_control_disabled = weakref.WeakSet()
+
+    _prober = None
+    _probe_cache = None
+    _prober_lock = threading.Lock()
+
+    _hub = None  # PollHub, created on the shared loop by the first scale in hub mode
+    budget = CPW_HUB_LATENCY_BUDGET
+
+    _metrics_registry = MetricsRegistry(frame_log=CPW_FRAME_LOG_SIZE)
+    _probe_miss_log = LogSummary(
+        _logger, logging.INFO, 'CPWplus: no CPWplus on %s (probe response %r)', interval=CPW_PROBE_LOG_SUMMARY_INTERVAL)
+
+    @classmethod
+    def _disable_flow_control(cls, connection, retries=None):
         """Disable DTR/RTS — FTDI adapters set these high by default,
-        which prevents the CPWplus from responding over RS-232."""
+        which prevents the CPWplus from responding over RS-232.
+
+        Does nothing if this connection's lines are already down.
+        Otherwise, instead of a fixed 0.5 s settle, polls until the scale
+        gives its first valid response (CPW_LINE_SETTLE_MAX at most) and
+        returns what was read.  ``retries`` caps the re-sent polls, see
+        wait_for_response().
+        """
+        if connection in cls._flow_control_disabled and not (connection.dtr or connection.rts):
+            return b''
         connection.dtr = False
         connection.rts = False
-        time.sleep(0.5)
+        cls._flow_control_disabled.add(connection)
+        protocol = cls._protocol
+        command = protocol.measureCommand + protocol.commandTerminator if protocol.measureCommand else None
+        return wait_for_response(connection, command, timeout=CPW_LINE_SETTLE_MAX, retries=retries)
 
     def __init__(self, identifier, device):
         super().__init__(identifier, device)
         self.device_manufacturer = 'Adam'
+        self._frame_reader = FrameReader(
+            self._protocol.commandTerminator, byte_time=10.0 / self._protocol.baudrate, valid=FRAME_REGEXP.search)
+        self._stream_thread = None
+        self._stream_reading = (None, 0.0)  # (WeightReading, time.monotonic()) of the newest streamed frame
+        self._snapshot = NO_SNAPSHOT  # replaced, never mutated, by _set_weight()
+        self._stream_stale = False
+        self._commands = collections.deque()  # (command, action data) waiting for the I/O thread
+        self._wakeup = threading.Event()
+        self._async_loop = None  # set while the I/O runs on the shared asyncio loop
+        self._async_wakeup = None
+        self._port = None  # AsyncFramePort over self._connection
+        self._connections = ConnectionManager(self._open_connection, setup=self._disable_flow_control)
+        self._connection_lost = False
+        self._parse_failures = 0
+        self._no_match_log = LogSummary(
+            _logger, logging.WARNING, 'CPWplus: NO MATCH on %s raw=%r',
+            interval=CPW_LOG_SUMMARY_INTERVAL,
+            resolved_message='CPWplus: frames from %s parse again' % identifier,
+        )
+        self._last_frame_weight = None
+        self._same_frames = 0
+        self._stable_waiters = collections.deque()  # (action data, deadline) of pending read_stable requests
+        self._read_once_waiters = []  # action data of read_once requests sharing the pending measurement
+        self._read_once_lock = threading.Lock()
+        self._poll_scheduler = PollScheduler(
+            self._protocol.newMeasureDelay,
+            fast=CPW_POLL_FAST,
+            idle=CPW_POLL_IDLE,
+            backoff=CPW_POLL_BACKOFF,
+            zero_band=CPW_POLL_ZERO_BAND,
+            deadband=CPW_EVENT_DEADBAND,
+        )
+        self._last_action = float('-inf')  # time.monotonic() of the last POS action
+        self._reading_leases = ReadingLeases(CPW_READING_LEASE)
+        self._is_reading = False
+        self._metrics = self._metrics_registry.device(identifier)
+        self._action_started = {}  # id(action data) -> time.monotonic() it came in, until answered
+        self._change_filter = ChangeFilter(
+            deadband=CPW_EVENT_DEADBAND,
+            stability_window=CPW_EVENT_STABILITY_WINDOW,
+            max_rate=CPW_EVENT_MAX_RATE,
+        )
+        self._dispatch_queue = collections.deque()  # (measurement?, event) for this thread to send in async/hub mode
+        self._dispatch_ready = threading.Condition()
+
+    def _open_connection(self):
+        """Open the port with the same settings as serial_connection(), but
+        without tying its lifetime to a with block."""
+        protocol = self._protocol
+        return serial.Serial(
+            self.device_identifier,
+            baudrate=protocol.baudrate,
+            bytesize=protocol.bytesize,
+            stopbits=protocol.stopbits,
+            parity=protocol.parity,
+            timeout=protocol.timeout,
+            writeTimeout=protocol.writeTimeout,
+        )
 
     def _set_actions(self):
         """Extend parent actions with tare and zero commands."""
@@ -74,6 +347,15 @@ class AdamCPWplusDriver(ScaleDriver):
             'zero': self._zero_action,
         })
 
+    def _start_reading_action(self, data):
+        self._reading_leases.start(data.get('session_id'))
+        self._is_reading = True
+
+    def _stop_reading_action(self, data):
+        self._reading_leases.stop(data.get('session_id'))
+        self._is_reading = bool(self._reading_leases.active())
+
+    # Synchronous versions, used when no I/O thread is running to queue to
     def _tare_action(self, data):
         self._connection.write(b'T' + self._protocol.commandTerminator)
         time.sleep(self._protocol.commandDelay)
@@ -84,35 +366,284 @@ class AdamCPWplusDriver(ScaleDriver):
         time.sleep(self._protocol.commandDelay)
         _logger.info('CPWplus: Zero command sent')
 
+    def _read_stable(self, data, deadline):
+        """read_stable with no I/O thread to wait for: poll every
+        CPW_READ_STABLE_INTERVAL seconds until a stable reading or
+        ``deadline``, holding _device_lock only for each poll so other
+        actions can run in between."""
+        try:
+            if not (self._connection and self._connection.isOpen()):
+                self._connection = self._connections.get()
+            while True:
+                with self._device_lock:
+                    if self._connection.dtr:
+                        self._disable_flow_control(self._connection)
+                    stable = self._read_weight() is not None and self.data['stable']
+                if stable or time.monotonic() >= deadline:
+                    break
+                time.sleep(CPW_READ_STABLE_INTERVAL)
+        except serial.SerialException:
+            _logger.exception('CPWplus: read_stable failed')
+            self._acknowledge_command(data, False, 'Lost the connection to the scale')
+            return
+        if stable:
+            self._acknowledge_command(data, True)
+        else:
+            self._acknowledge_command(data, False, 'The weight did not settle within %gs' % CPW_READ_STABLE_TIMEOUT)
+
     @classmethod
     def supported(cls, device):
+        identifier = device['identifier']
+        known = cls._cached_probe(identifier)
+        if known is not None:
+            _logger.debug('CPWplus: probe cache says %s is%s a CPWplus', identifier, '' if known else ' not')
+            return known
+        if not CPW_PARALLEL_PROBING:
+            return cls._probe_and_record(identifier)
+        with cls._prober_lock:
+            if cls._prober is None:
+                cls._prober = ParallelProber(
+                    cls._probe_and_record, max_workers=CPW_PROBE_WORKERS, speculate=cls._probe_speculatively,
+                    known=lambda path: cls._cached_probe(path) is not None)
+        return cls._prober.result(identifier)
+
+    @classmethod
+    def _cached_probe(cls, identifier):
+        """The probe cache's True/False for ``identifier``, or None."""
+        cache = cls._get_probe_cache()
+        return None if cache is None else cache.get(identifier)
+
+    @classmethod
+    def _get_probe_cache(cls):
+        if not CPW_PROBE_CACHE_FILE:
+            return None
+        with cls._prober_lock:
+            if cls._probe_cache is None:
+                cls._probe_cache = ProbeCache(
+                    CPW_PROBE_CACHE_FILE, ttl=CPW_PROBE_CACHE_TTL, negative_ttl=CPW_PROBE_CACHE_NEGATIVE_TTL)
+        return cls._probe_cache
+
+    @classmethod
+    def _probe_and_record(cls, identifier):
+        supported = cls._probe(identifier)
+        cache = cls._get_probe_cache()
+        if cache is not None:
+            cache.put(identifier, supported)
+        return supported
+
+    @classmethod
+    def _probe_speculatively(cls, identifier):
+        """Probe a port the framework has not asked about yet.
+
+        Another driver's supported() may open it at any moment, so the port
+        is skipped (None) if this process already has it open or another
+        exclusive user holds it, and only a positive answer is cached: a
+        negative one may come from a reply garbled by a second probe.
+        """
+        if os.path.realpath(identifier) in ports_open_in_process():
+            return None
+        supported = cls._probe(identifier, exclusive=True)
+        cache = cls._get_probe_cache()
+        if supported and cache is not None:
+            cache.put(identifier, supported)
+        return supported
+
+    @classmethod
+    def _probe(cls, identifier, exclusive=False):
+        """Open ``identifier`` and check whether a CPWplus answers on it.
+        With ``exclusive``, return None if the port is busy instead."""
         protocol = cls._protocol
+        if exclusive:
+            try:
+                port = serial.Serial(
+                    identifier, baudrate=protocol.baudrate, bytesize=protocol.bytesize, stopbits=protocol.stopbits,
+                    parity=protocol.parity, timeout=1, writeTimeout=1, exclusive=True)
+            except serial.SerialException:
+                _logger.debug('CPWplus: %s is busy, not probing it speculatively', identifier)
+                return None
+            opened = contextlib.closing(port)
+        else:
+            opened = serial_connection(identifier, protocol, is_probing=True)
         try:
-            with serial_connection(device['identifier'], protocol, is_probing=True) as connection:
-                cls._disable_flow_control(connection)
-                _logger.info('Probing %s with protocol %s', device['identifier'], protocol.name)
-                connection.write(b'G' + protocol.commandTerminator)
-                time.sleep(protocol.commandDelay)
-                answer = connection.read(30)
-                _logger.info('Probe response from %s: %r', device['identifier'], answer)
-                if (b'G/W' in answer or b'N/W' in answer
-                        or re.search(rb'[+-]\s*[0-9.]+\s+(?:lb|kg|oz)', answer)):
-                    _logger.info('CPWplus identified on %s', device['identifier'])
+            with opened as connection:
+                _logger.debug('Probing %s with protocol %s', identifier, protocol.name)
+                # The settle after dropping DTR/RTS already polls with G and
+                # returns the first valid response; give a slow port one
+                # last commandDelay before giving up on it.  The port may be
+                # a printer or customer display, so G is written only once.
+                answer = cls._disable_flow_control(connection, retries=0)
+                if not looks_like_cpwplus(answer):
+                    answer += wait_for_response(connection, timeout=protocol.commandDelay)
+                _logger.debug('Probe response from %s: %r', identifier, answer)
+                if looks_like_cpwplus(answer):
+                    _logger.info('CPWplus identified on %s', identifier)
                     return True
+                cls._probe_miss_log(identifier, answer)
         except serial.serialutil.SerialTimeoutException:
             pass
         except Exception:
-            _logger.exception('Error probing %s', device['identifier'])
+            _logger.exception('Error probing %s', identifier)
         return False
 
+    # ------------------------------------------------------------------
+    # I/O loop — base SerialDriver.run(), except that:
+    # - the connection comes from self._connections and is reopened (with
+    #   backoff) after a serial error instead of ending the thread
+    # - the wait between measurements comes from _next_poll_delay(), and
+    #   is cut short when a command is queued or a POS action comes in
+    # ------------------------------------------------------------------
+    def run(self):
+        if CPW_ASYNC_IO or CPW_HUB_MODE:
+            return self._run_async()
+        self._status['status'] = self.STATUS_CONNECTING
+        try:
+            while not self._stopped.is_set():
+                try:
+                    self._connection = self._connections.get()
+                    if self._status['status'] != self.STATUS_CONNECTED:
+                        self._connection_restored()
+                    self._metrics.begin_io(time.monotonic())
+                    self._take_measure()
+                    self._metrics.end_io(time.monotonic())
+                    delay = self._next_poll_delay()
+                except (serial.SerialException, OSError):
+                    self._connection_failed()
+                    delay = max(self._protocol.newMeasureDelay, self._connections.retry_in())
+                if not self._commands:
+                    self._wakeup.wait(delay)
+                self._wakeup.clear()
+            self._push_status()
+        except Exception:
+            msg = 'Error while reading %s' % self.device_name
+            _logger.exception(msg)
+            self._status = {'status': self.STATUS_ERROR, 'message_title': msg, 'message_body': traceback.format_exc()}
+            self._push_status()
+        finally:
+            self._connections.close()
+            self._fail_queued_commands()
+
+    def disconnect(self):
+        super().disconnect()
+        self._wake()
+
+    def _next_poll_delay(self):
+        """Seconds until the next poll: self._poll_scheduler's delay while a
+        POS session is reading or acting, at most newMeasureDelay shortly
+        after a reading lease ran out, at least CPW_READING_HEARTBEAT
+        otherwise; at most CPW_READ_STABLE_INTERVAL while a read_stable
+        request waits."""
+        now = time.monotonic()
+        self._is_reading = bool(self._reading_leases.active(now))
+        in_session = self._is_reading or now - self._last_action < CPW_POLL_SESSION_HOLD
+        delay = self._poll_scheduler.next_delay(self.data.get('result'), active=in_session)
+        if not in_session:
+            if now - self._reading_leases.lapsed_at < CPW_READING_LAPSE_HOLD:
+                delay = min(delay, self._poll_scheduler.normal)
+            elif CPW_READING_HEARTBEAT:
+                delay = max(delay, CPW_READING_HEARTBEAT)
+        if self._stable_waiters:
+            delay = min(delay, CPW_READ_STABLE_INTERVAL)
+        return delay
+
+    def _wake(self):
+        """Cut the I/O loop's wait between measurements short."""
+        self._wakeup.set()
+        loop = self._async_loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._wake_async)
+
+    def _wake_async(self):
+        if CPW_HUB_MODE:
+            if self._hub is not None:
+                self._hub.wake(self)
+        elif self._async_wakeup is not None:
+            self._async_wakeup.set()
+
+    def _connection_restored(self):
+        self._status = {'status': self.STATUS_CONNECTED, 'message_title': '', 'message_body': ''}
+        self._push_status()
+        self._metrics.connected = 1
+        if self._connection_lost:
+            self._connection_lost = False
+            self._metrics.reconnects += 1
+            _logger.info('CPWplus: reconnected to %s %s', self.device_identifier, self._connections.stats())
+
+    def _connection_failed(self):
+        """Drop the broken connection; the next loop iteration reopens it."""
+        msg = 'Error while reading %s' % self.device_name
+        self._metrics.connected = 0
+        self._metrics.connection_errors += 1
+        if not self._connection_lost:
+            self._connection_lost = True
+            _logger.exception('CPWplus: %s', msg)
+        self._connections.invalidate(self._connection)
+        self._status = {'status': self.STATUS_ERROR, 'message_title': msg, 'message_body': traceback.format_exc()}
+        self._push_status()
+        self._fail_queued_commands()
+
     # ------------------------------------------------------------------
     # DTR/RTS fix — applied before any serial read
     # ------------------------------------------------------------------
     def _take_measure(self):
-        """Base ScaleDriver._take_measure with DTR/RTS fix."""
+        """Base ScaleDriver._take_measure with DTR/RTS fix.
+
+        Runs at most one queued command first, so commands and weight
+        polls take turns on the wire.  Instead of pushing an event on every
+        change of self.data['result'], the change goes through
+        self._change_filter so idle jitter is coalesced; see
+        _publish_measure().
+        """
         if self._connection and self._connection.dtr:
             self._disable_flow_control(self._connection)
-        super()._take_measure()
+        if self._commands:
+            self._run_queued_command(*self._commands.popleft())
+        with self._device_lock:
+            stable = self.data.get('stable')
+            self._read_weight()
+            self._count_skipped(self._frame_reader)
+        # Publishing works on the snapshot just taken and may block on
+        # event_manager; it does not need the port
+        self._publish_measure(stable)
+
+    def _count_skipped(self, reader):
+        """Move the bytes ``reader`` dropped to resynchronise into the metrics."""
+        if reader.skipped:
+            self._metrics.bytes_skipped += reader.skipped
+            reader.skipped = 0
+
+    def _publish_measure(self, stable):
+        """Push the reading just taken, if the change filter lets it through
+        or the stable flag changed from ``stable``; answer read_stable.
+
+        With no session reading (see CPW_UNOWNED_EVENT_INTERVAL) only an
+        error forces an event, and changes are rate limited harder.
+        """
+        error = self._status['status'] == self.STATUS_ERROR
+        if self._is_reading or not CPW_UNOWNED_EVENT_INTERVAL:
+            publish = self._change_filter.offer(self.data['result'], force=error or self.data.get('stable') != stable)
+        else:
+            publish = self._change_filter.offer(
+                self.data['result'], force=error, min_interval=CPW_UNOWNED_EVENT_INTERVAL)
+        if publish:
+            self._send_measure()
+        else:
+            self._metrics.events_filtered += 1
+        if self._stable_waiters:
+            self._resolve_stable_waiters()
+
+    def _send_measure(self):
+        self.last_sent_value = self.data['result']
+        self._metrics.events += 1
+        if self._is_reading:
+            holders = self._reading_leases.holders()
+            if len(holders) == 1:
+                self._device_changed({'owner': holders[0]})
+            else:
+                self._device_changed()
+            # The scale is in use: keep the sessions reading it alive
+            self._reading_leases.extend_all()
+        else:
+            self._device_changed()
 
     def _do_action(self, data):
         """Base SerialDriver._do_action with DTR/RTS fix."""
@@ -131,55 +662,560 @@ class AdamCPWplusDriver(ScaleDriver):
     def action(self, data):
         self.data["owner"] = data.get('session_id')
         self.data["action_args"] = {**data}
+        if data.get('action') == 'dump_frames':
+            # Diagnostics: answered from the frame ring, the port is not touched
+            self._metrics.actions += 1
+            frames = self._metrics.recent_frames.dump()
+            self._device_changed({**data, 'status': 'success', 'frames': frames})
+            return
+        if data.get('action') in ('start_reading', 'stop_reading'):
+            # Only changes how often the I/O thread polls; the port is not touched
+            self._metrics.actions += 1
+            self._actions[data['action']](data)
+            if self._is_reading:
+                self._wake()
+            self._device_changed({**data, 'status': 'success'})
+            return
+        self._reading_leases.renew(data.get('session_id'))
+        # POS is using the scale: switch the I/O thread to fast polling now
+        started = self._last_action = time.monotonic()
+        self._metrics.actions += 1
+        self._wake()
 
-        if self._connection and self._connection.isOpen():
-            self._do_action(data)
-        else:
-            with serial_connection(self.device_identifier, self._protocol) as connection:
-                self._connection = connection
-                self._do_action(data)
+        if data.get('action') == 'read_stable':
+            self._action_started[id(data)] = started
+            if self.is_alive():
+                # Answered by the I/O thread on the first stable reading
+                self._stable_waiters.append((data, started + CPW_READ_STABLE_TIMEOUT))
+                self._wake()
+            else:
+                self._read_stable(data, started + CPW_READ_STABLE_TIMEOUT)
+            return
+
+        if data.get('action') == 'read_once' and self._read_once_cached(data, started):
+            return
+
+        command = self._queued_commands.get(data.get('action'))
+        if data.get('action') == 'read_once' and (
+                self._async_loop is not None
+                or self.is_alive() and self._connection and self._connection.isOpen()):
+            # A None command is a plain poll, taken by the I/O loop between
+            # its own, so the action neither waits for _device_lock nor
+            # sleeps commandDelay like _do_action().  Requests arriving
+            # while it is pending are answered by the same poll.
+            with self._read_once_lock:
+                self._action_started[id(data)] = started
+                self._read_once_waiters.append(data)
+                if len(self._read_once_waiters) > 1:
+                    self._metrics.reads_shared += 1
+                    return
+            self._commands.append((None, data))
+            self._wake()
+            return
+        if command and self.is_alive() and self._connection and self._connection.isOpen():
+            # Acknowledged by the I/O thread once the scale confirms it
+            self._action_started[id(data)] = started
+            self._commands.append((command, data))
+            self._wake()
+            return
+
+        if not (self._connection and self._connection.isOpen()):
+            # Reuses (or lazily reopens) the I/O thread's connection rather
+            # than paying for a fresh port open and line setup per action
+            self._connection = self._connections.get()
+        self._do_action(data)
 
         # Merge status:'success' into event data — **data is applied last
         # in event_manager.device_changed so this overwrites self.data's
         # status dict, while leaving self.data untouched for _take_measure.
         response_data = {**data, 'status': 'success'}
-        event_manager.device_changed(self, response_data)
+        self._device_changed(response_data)
+        self._metrics.action_seconds.observe(time.monotonic() - started)
+
+    # ------------------------------------------------------------------
+    # Command queue — tare/zero are written by the I/O thread between weight
+    # polls, and acknowledged to POS once the scale answers again.
+    # ------------------------------------------------------------------
+    def _run_queued_command(self, command, data):
+        protocol = self._protocol
+        with self._device_lock:
+            try:
+                if command is None:
+                    confirmed = self._read_weight() is not None
+                    self._count_skipped(self._frame_reader)
+                else:
+                    sent = time.monotonic()
+                    self._connection.write(command + protocol.commandTerminator)
+                    _logger.info('CPWplus: %s command sent', data['action'].capitalize())
+                    if protocol.measureCommand:
+                        # Give the scale commandDelay to act on the command,
+                        # discarding any reply line, then confirm with a poll
+                        self._frame_reader.read_frame(self._connection, timeout=protocol.commandDelay)
+                        self._frame_reader.reset()
+                        confirmed = self._read_weight() is not None
+                    else:
+                        confirmed = self._wait_for_streamed_frame(sent + protocol.commandDelay)
+            except serial.SerialException:
+                _logger.exception('CPWplus: %s command failed', data['action'])
+                confirmed = False
+        if command is None:
+            self._acknowledge_read_once(confirmed)
+        else:
+            self._acknowledge_command(data, confirmed)
+
+    def _read_once_cached(self, data, now):
+        """Answer read_once from the newest snapshot if it is stable and
+        no older than the request's max_age; return whether it did."""
+        try:
+            max_age = float(data.get('max_age', CPW_READ_ONCE_MAX_AGE))
+        except (TypeError, ValueError):
+            max_age = CPW_READ_ONCE_MAX_AGE
+        snapshot = self._snapshot
+        if (not snapshot.stable or snapshot.age(now) > max_age
+                or self._status['status'] != self.STATUS_CONNECTED):
+            return False
+        self._metrics.reads_cached += 1
+        self._metrics.action_seconds.observe(time.monotonic() - now)
+        self._device_changed({
+            **data,
+            'status': 'success',
+            'value': snapshot.weight,
+            'result': snapshot.weight,
+            'unit': snapshot.unit,
+            'stable': snapshot.stable,
+            'overload': snapshot.overload,
+        })
+        return True
+
+    def _acknowledge_read_once(self, confirmed):
+        """Answer every read_once that shared the measurement just taken."""
+        with self._read_once_lock:
+            waiters, self._read_once_waiters = self._read_once_waiters, []
+        for data in waiters:
+            self._acknowledge_command(data, confirmed)
+
+    def _fail_queued_commands(self):
+        while self._commands:
+            command, data = self._commands.popleft()
+            if command is not None:
+                self._acknowledge_command(data, False)
+        self._acknowledge_read_once(False)
+        while self._stable_waiters:
+            self._acknowledge_command(self._stable_waiters.popleft()[0], False, 'Lost the connection to the scale')
+
+    def _acknowledge_command(self, data, confirmed, message=None):
+        started = self._action_started.pop(id(data), None)
+        if started is not None:
+            self._metrics.action_seconds.observe(time.monotonic() - started)
+        if confirmed:
+            self._device_changed({**data, 'status': 'success'})
+            return
+        message = message or 'The scale did not confirm the %s command' % data.get('action')
+        _logger.warning('CPWplus: %s failed: %s', data.get('action'), message)
+        self._device_changed({**data, 'status': 'error', 'message': message})
+
+    def _resolve_stable_waiters(self):
+        """Answer read_stable requests from the reading just taken: success
+        if it is stable, an error for requests past their deadline."""
+        stable = self.data.get('stable') and self._status['status'] != self.STATUS_ERROR
+        now = time.monotonic()
+        for _ in range(len(self._stable_waiters)):
+            data, deadline = self._stable_waiters.popleft()
+            if stable:
+                self._acknowledge_command(data, True)
+            elif now >= deadline:
+                self._acknowledge_command(
+                    data, False, 'The weight did not settle within %gs' % CPW_READ_STABLE_TIMEOUT)
+            else:
+                self._stable_waiters.append((data, deadline))
+
+    def _wait_for_streamed_frame(self, since):
+        """Wait for a streamed frame received after ``since``; True if one came."""
+        deadline = since + CPW_STREAM_STALE_AFTER
+        while time.monotonic() < deadline:
+            reading, received = self._stream_reading
+            if reading is not None and received > since:
+                self._set_weight(reading.weight, reading)
+                return True
+            time.sleep(0.01)
+        return False
 
     # ------------------------------------------------------------------
-    # Weight reading — fast \r\n-terminated read with sign handling
+    # Weight reading — bulk \r\n-terminated read with sign handling
     # ------------------------------------------------------------------
     def _read_weight(self):
+        """Update self.data; return the new weight, or None if none was read."""
         protocol = self._protocol
+        if not protocol.measureCommand:
+            return self._read_streamed_weight()
+
+        # A late reply to an earlier poll, or frames from a scale left in
+        # trn 2, would otherwise be taken for the answer to this one
+        self._frame_reader.flush(self._connection)
+        sent = time.monotonic()
         self._connection.write(protocol.measureCommand + protocol.commandTerminator)
-        time.sleep(protocol.measureDelay)
-
-        answer = b''
-        while len(answer) < 40:
-            byte = self._connection.read(1)
-            if not byte:
-                break
-            answer += byte
-            if answer.endswith(b'\r\n'):
-                break
-
-        match = re.search(protocol.measureRegexp, answer)
-        if match:
-            weight = float(match.group(1))
-            sign_match = re.search(CPW_SIGN_REGEXP, answer)
-            if sign_match:
-                weight = -weight
-            self.data = {
-                'value': weight,
-                'result': weight,
-                'status': self._status,
-            }
+        if CPW_WAIT_FOR_READY:
+            answer = self._frame_reader.read_frame(self._connection, timeout=protocol.measureDelay)
         else:
-            _logger.warning('CPWplus: NO MATCH raw=%r', answer)
-            self.data = {
-                'value': self.data.get('result', 0),
-                'result': self.data.get('result', 0),
-                'status': self._status,
-            }
+            time.sleep(protocol.measureDelay)
+            answer = self._frame_reader.read_frame(self._connection)
+        return self._apply_frame(answer, sent)
+
+    def _apply_frame(self, answer, sent):
+        """Update self.data from the reply to a poll sent at ``sent``
+        (time.monotonic()); return its weight or None."""
+        metrics = self._metrics
+        metrics.polls += 1
+        metrics.bytes_read += len(answer)
+        received = time.monotonic()
+        complete = answer.endswith(self._protocol.commandTerminator)
+        if complete:
+            metrics.poll_seconds.observe(received - sent)
+        else:
+            metrics.timeouts += 1
+        reading = self._parse_reading(answer)
+        if reading is not None:
+            metrics.frames += 1
+            metrics.recent_frames.record(received, answer, FRAME_OK, reading.weight)
+            if self._parse_failures:
+                self._parse_recovered()
+            self._set_weight(reading.weight, reading)
+            return reading.weight
+        metrics.parse_failures += 1
+        metrics.recent_frames.record(received, answer, FRAME_NO_MATCH if complete else FRAME_TIMEOUT)
+        self._parse_failed(answer)
+        self._set_weight(self.data.get('result', 0))
+        return None
+
+    def _parse_reading(self, answer):
+        """Return the WeightReading in ``answer``, or None if it has none.
+
+        Firmware that sends no ST/US status gets ``stable`` from the frames
+        themselves: CPW_STABLE_FRAMES frames in a row with the same weight.
+        """
+        reading = parse_frame(answer)
+        if reading is not None:
+            if reading.weight == self._last_frame_weight:
+                self._same_frames += 1
+            else:
+                self._same_frames = 1
+            self._last_frame_weight = reading.weight
+            if reading.stable is None:
+                reading.stable = not reading.overload and self._same_frames >= CPW_STABLE_FRAMES
+        return reading
+
+    def _parse_failed(self, frame):
+        """Count and log a frame that did not parse; after too many in a row,
+        stop trusting the cached identification of this port."""
+        self._no_match_log(self.device_identifier, frame)
+        self._parse_failures += 1
+        if self._parse_failures == CPW_PROBE_CACHE_MAX_PARSE_FAILURES:
+            cache = self._get_probe_cache()
+            if cache is not None:
+                _logger.warning('CPWplus: %d unparsable frames in a row on %s, dropping its probe cache entry',
+                                self._parse_failures, self.device_identifier)
+                cache.invalidate(self.device_identifier)
+
+    def _parse_recovered(self):
+        self._parse_failures = 0
+        self._no_match_log.resolved()
+
+    def _set_weight(self, weight, reading=None):
+        """Publish ``weight`` as a new snapshot and in self.data.  Without a
+        fresh ``reading`` the weight is the last known one, so it is
+        reported as not stable."""
+        snapshot = self._snapshot = WeightSnapshot(
+            self._snapshot.sequence + 1,
+            time.monotonic(),
+            weight,
+            reading.unit if reading else self._snapshot.unit,
+            bool(reading and reading.stable),
+            bool(reading and reading.overload),
+        )
+        self.data = {
+            'value': weight,
+            'result': weight,
+            'unit': snapshot.unit,
+            'stable': snapshot.stable,
+            'overload': snapshot.overload,
+            'status': self._status,
+        }
+
+    def snapshot(self):
+        """The newest reading as an immutable WeightSnapshot.  Safe from any
+        thread without a lock: the I/O path swaps in a new object per
+        reading and never changes a published one."""
+        return self._snapshot
+
+    # ------------------------------------------------------------------
+    # Continuous-stream mode (trn 2) — the scale sends frames on its own.
+    # A reader thread consumes them and keeps only the newest parsed
+    # weight; _read_weight then just picks it up from memory.
+    # ------------------------------------------------------------------
+    def _read_streamed_weight(self):
+        self._start_stream_reader()
+        reading, received = self._stream_reading
+        if time.monotonic() - received <= CPW_STREAM_STALE_AFTER:
+            if reading is None:
+                return None
+            self._stream_stale = False
+            self._set_weight(reading.weight, reading)
+            return reading.weight
+        if not self._stream_stale:
+            self._stream_stale = True
+            _logger.warning('CPWplus: no streamed frame for %ss — is the scale set to trn 2?',
+                            CPW_STREAM_STALE_AFTER)
+        self._set_weight(self.data.get('result', 0))
+        return None
+
+    def _start_stream_reader(self):
+        if self._async_loop is not None:
+            return  # the AsyncFramePort delivers frames to _stream_frame
+        if self._stream_thread and self._stream_thread.is_alive():
+            return
+        # No frame yet: give the new reader a full stale period to get one
+        self._stream_reading = (None, time.monotonic())
+        self._stream_thread = threading.Thread(
+            target=self._stream_loop,
+            args=(self._connection,),
+            name='%s stream reader' % self.device_identifier,
+            daemon=True,
+        )
+        self._stream_thread.start()
+
+    def _stream_loop(self, connection):
+        reader = FrameReader(
+            self._protocol.commandTerminator, byte_time=10.0 / self._protocol.baudrate, valid=FRAME_REGEXP.search)
+        while not self._stopped.is_set() and connection.is_open:
+            try:
+                frame = reader.read_frame(connection)
+                self._count_skipped(reader)
+                # Skip frames that already have a newer one queued behind them
+                if reader.has_frame() or connection.in_waiting >= len(frame):
+                    continue
+            except serial.SerialException:
+                if connection.is_open:
+                    _logger.exception('CPWplus: stream reader stopped on %s', self.device_identifier)
+                return
+            self._stream_frame(frame)
+
+    def _stream_frame(self, frame):
+        metrics = self._metrics
+        metrics.bytes_read += len(frame)
+        received = time.monotonic()
+        reading = self._parse_reading(frame)
+        if reading is not None:
+            metrics.frames += 1
+            metrics.recent_frames.record(received, frame, FRAME_OK, reading.weight)
+            if self._parse_failures:
+                self._parse_recovered()
+            self._stream_reading = (reading, received)
+        elif frame:
+            metrics.parse_failures += 1
+            metrics.recent_frames.record(received, frame, FRAME_NO_MATCH)
+            self._parse_failed(frame)
+
+    # ------------------------------------------------------------------
+    # asyncio I/O (CPW_ASYNC_IO) — the same loop as run(), as a coroutine on
+    # the shared event loop.  All wire I/O for the device happens in poll(),
+    # called either by this device's own coroutine or, in hub mode, by the
+    # shared PollHub, so it needs no _device_lock; actions that would touch
+    # the port (read_once, tare, zero) are queued to it.
+    # ------------------------------------------------------------------
+    def _run_async(self):
+        loop = shared_event_loop()
+        self._async_loop = loop
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._io_loop_async(), loop)
+            future.add_done_callback(lambda _future: self._queue_event(False, None))
+            # This thread has no I/O of its own here: it sends the events, so
+            # a slow event_manager dispatch never stalls the shared loop
+            self._send_queued_events(block=True)
+            future.result()
+        except Exception:
+            msg = 'Error while reading %s' % self.device_name
+            _logger.exception(msg)
+            self._status = {'status': self.STATUS_ERROR, 'message_title': msg, 'message_body': traceback.format_exc()}
+            self._push_status()
+        finally:
+            self._async_loop = None
+            self._send_queued_events()
+            self._fail_queued_commands()
+
+    def _device_changed(self, data=None):
+        """event_manager.device_changed(), which may block on its HTTP POST
+        to the Odoo server.  Called on the shared event loop, the event is
+        frozen as it is now and handed to this driver's thread instead, so
+        one slow dispatch cannot hold up every scale's polls."""
+        if self._on_event_loop():
+            self._queue_event(not (data and 'action' in data), {**self.data, **(data or {})})
+        else:
+            event_manager.device_changed(self, data)
+
+    def _on_event_loop(self):
+        try:
+            return asyncio.get_running_loop() is self._async_loop
+        except RuntimeError:
+            return False
+
+    def _queue_event(self, measurement, event):
+        """Queue ``event`` for _send_queued_events(); None ends it.  A
+        measurement still waiting behind a slow dispatch is replaced by the
+        newer one, action answers are all kept."""
+        with self._dispatch_ready:
+            queued = self._dispatch_queue
+            if measurement and queued and queued[-1][0]:
+                queued[-1] = (measurement, event)
+                self._metrics.events_superseded += 1
+            else:
+                queued.append((measurement, event))
+            self._dispatch_ready.notify()
+
+    def _send_queued_events(self, block=False):
+        """Send the events _device_changed() queued, in order; with
+        ``block``, until _run_async() queues the None that ends its I/O."""
+        while True:
+            with self._dispatch_ready:
+                while block and not self._dispatch_queue:
+                    self._dispatch_ready.wait()
+                if not self._dispatch_queue:
+                    return
+                event = self._dispatch_queue.popleft()[1]
+            if event is None:
+                return
+            try:
+                event_manager.device_changed(self, event)
+            except Exception:
+                _logger.exception('CPWplus: sending an event for %s failed', self.device_name)
+
+    async def _io_loop_async(self):
+        self._status['status'] = self.STATUS_CONNECTING
+        try:
+            if CPW_HUB_MODE:
+                if self._hub is None:
+                    type(self)._hub = PollHub(asyncio.get_running_loop(), max_in_flight=CPW_HUB_MAX_IN_FLIGHT)
+                await self._hub.add(self)
+                return
+            self._async_wakeup = asyncio.Event()
+            while True:
+                delay = await self.poll()
+                if delay is None:
+                    return
+                if not self._commands:
+                    try:
+                        await asyncio.wait_for(self._async_wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                self._async_wakeup.clear()
+        finally:
+            self._async_wakeup = None
+            if self._port is not None:
+                self._port.close()
+                self._port = None
+            self._connections.close()
+
+    async def poll(self):
+        """One iteration of the I/O loop: make sure the port is open, take a
+        measurement; return the seconds until the next one, or None once
+        the driver is stopped."""
+        if self._stopped.is_set():
+            self._push_status()
+            return None
+        try:
+            if self._port is None:
+                loop = asyncio.get_running_loop()
+                self._connection = await loop.run_in_executor(None, self._connections.get)
+                self._port = self._open_port(loop)
+            if self._status['status'] != self.STATUS_CONNECTED:
+                self._connection_restored()
+            self._metrics.begin_io(time.monotonic())
+            await self._take_measure_async(self._port)
+            self._metrics.end_io(time.monotonic())
+        except (serial.SerialException, OSError):
+            if self._port is not None:
+                self._port.close()
+                self._port = None
+            self._connection_failed()
+            return max(self._protocol.newMeasureDelay, self._connections.retry_in())
+        if self._commands:
+            return 0
+        return self._next_poll_delay()
+
+    def _open_port(self, loop):
+        on_frame = None
+        if not self._protocol.measureCommand:
+            on_frame = self._stream_frame
+            self._stream_reading = (None, time.monotonic())
+        return AsyncFramePort(
+            self._connection, loop, self._protocol.commandTerminator, on_frame=on_frame,
+            byte_time=10.0 / self._protocol.baudrate, valid=FRAME_REGEXP.search)
+
+    async def _take_measure_async(self, port):
+        if self._commands:
+            await self._run_queued_command_async(port, *self._commands.popleft())
+        stable = self.data.get('stable')
+        await self._read_weight_async(port)
+        self._count_skipped(port)
+        self._publish_measure(stable)
+
+    async def _read_weight_async(self, port):
+        protocol = self._protocol
+        if not protocol.measureCommand:
+            return self._read_streamed_weight()
+        sent = time.monotonic()
+        answer = await port.request(protocol.measureCommand + protocol.commandTerminator, protocol.measureDelay)
+        return self._apply_frame(answer, sent)
+
+    async def _run_queued_command_async(self, port, command, data):
+        protocol = self._protocol
+        try:
+            if command is None:
+                confirmed = await self._read_weight_async(port) is not None
+            else:
+                sent = time.monotonic()
+                port.write(command + protocol.commandTerminator)
+                _logger.info('CPWplus: %s command sent', data['action'].capitalize())
+                if protocol.measureCommand:
+                    await port.read_frame(protocol.commandDelay)
+                    confirmed = await self._read_weight_async(port) is not None
+                else:
+                    confirmed = await self._wait_for_streamed_frame_async(sent + protocol.commandDelay)
+        except serial.SerialException:
+            _logger.exception('CPWplus: %s command failed', data['action'])
+            confirmed = False
+        if command is None:
+            self._acknowledge_read_once(confirmed)
+        else:
+            self._acknowledge_command(data, confirmed)
+
+    async def _wait_for_streamed_frame_async(self, since):
+        deadline = since + CPW_STREAM_STALE_AFTER
+        while time.monotonic() < deadline:
+            reading, received = self._stream_reading
+            if reading is not None and received > since:
+                self._set_weight(reading.weight, reading)
+                return True
+            await asyncio.sleep(0.01)
+        return False
 
     def _read_status(self, answer):
+        # Stability and overload come with the weight frame; see _parse_reading
         pass
+
+
+class CPWplusMetricsController(http.Controller):
+    """Prometheus scrape target and recent raw frames for every CPWplus on this IoT Box."""
+
+    @http.route(CPW_METRICS_ROUTE, type='http', auth='none', cors='*', csrf=False, save_session=False)
+    def cpwplus_metrics(self):
+        return http.Response(
+            AdamCPWplusDriver._metrics_registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+    @http.route(CPW_FRAMES_ROUTE, type='http', auth='none', cors='*', csrf=False, save_session=False)
+    def cpwplus_frames(self):
+        return http.Response(
+            json.dumps(AdamCPWplusDriver._metrics_registry.recent_frames(), indent=1),
+            content_type='application/json',
+        )
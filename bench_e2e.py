@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""End-to-end latency benchmark: from the driver asking for a weight to
+the event_manager.device_changed() call that carries it to POS.
+
+Runs the real AdamCPWplusDriver against a PTY fake scale
+(cpwplus_simulator.FakeScale).  Odoo is not needed: unless the IoT Box's
+iot_drivers package is importable, a minimal stand-in for it is installed
+first (the base classes as described in TROUBLESHOOTING.md, and an
+event_manager that just records when device_changed() is called).
+
+Every reading is split into the stages the latency goes through:
+
+    queue                   action_read_once only: action() -> the driver's
+                            I/O thread writing the G for it
+    write_to_first_byte     G written -> scale's first reply byte on the wire
+    first_byte_to_frame     first byte -> complete frame handed to the parser
+    parse                   _parse_reading()
+    dispatch                parsed -> device_changed() called (polling), or
+                            _take_measure() picking the reading up ->
+                            device_changed() (streaming)
+    wait_for_poll           streaming only: parsed -> next _take_measure()
+    total                   first stage start -> device_changed()
+
+in three scenarios:
+
+    polling           trn 1, _take_measure() called in a loop
+    action_read_once  trn 1, action({'action': 'read_once', 'max_age': 0}), i.e.
+                      POS asking for a weight that is always measured, with
+                      the driver's I/O thread running as on the IoT Box
+    streaming         trn 2, _take_measure() every newMeasureDelay while
+                      the stream reader thread parses the scale's frames
+
+and reports count/min/p50/p95/p99/max per stage in milliseconds, as JSON
+(to stdout, or to --output) so runs can be compared for regressions.
+
+Usage:
+    python3 bench_e2e.py [--samples N] [--latency MS] [--jitter MS] [--output FILE]
+
+Requirements:
+    pip install pyserial   (Linux/macOS — needs a PTY)
+"""
+
+import argparse
+import collections
+import importlib.util
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import types
+
+import serial
+
+import cpwplus_protocol
+from benchlib import summary
+from cpwplus_simulator import FakeScale
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STREAM_INTERVAL = 0.05  # seconds between frames in trn 2
+
+# PTYs reject the modem-line ioctls; skip them like a port without DTR/RTS
+serial.Serial._update_dtr_state = lambda self: None
+serial.Serial._update_rts_state = lambda self: None
+
+now = time.perf_counter
+
+
+# ----------------------------------------------------------------------
+# Odoo stand-in — just enough of iot_drivers to run the driver
+# ----------------------------------------------------------------------
+class RecordingEventManager:
+    def __init__(self):
+        self.listener = None
+
+    def device_changed(self, device, data=None):
+        event = {**device.data, 'device_identifier': device.device_identifier, 'time': time.time(), **(data or {})}
+        if self.listener:
+            self.listener(now(), event)
+
+
+def install_odoo_stubs():
+    """Register a minimal odoo.addons.iot_drivers in sys.modules."""
+    event_manager = RecordingEventManager()
+
+    class Driver(threading.Thread):
+        daemon = True
+        priority = 0
+
+        def __init__(self, identifier, device):
+            super().__init__()
+            self.device_identifier = identifier
+            self.data = {'value': '', 'result': ''}
+            self._actions = {}
+            self._stopped = threading.Event()
+
+        def disconnect(self):
+            self._stopped.set()
+
+    SerialProtocol = collections.namedtuple('SerialProtocol', (
+        'name baudrate bytesize stopbits parity timeout writeTimeout measureRegexp statusRegexp '
+        'commandTerminator commandDelay measureDelay newMeasureDelay measureCommand emptyAnswerValid'))
+
+    class serial_connection:
+        def __init__(self, path, protocol, is_probing=False):
+            timeout = 1 if is_probing else protocol.timeout
+            self.connection = serial.Serial(path, baudrate=protocol.baudrate, timeout=timeout, writeTimeout=timeout)
+
+        def __enter__(self):
+            return self.connection
+
+        def __exit__(self, *exc):
+            self.connection.close()
+
+    class SerialDriver(Driver):
+        _protocol = None
+        STATUS_CONNECTED = 'connected'
+        STATUS_ERROR = 'error'
+        STATUS_CONNECTING = 'connecting'
+
+        def __init__(self, identifier, device):
+            super().__init__(identifier, device)
+            self._device_lock = threading.Lock()
+            self._status = {'status': self.STATUS_CONNECTING, 'message_title': '', 'message_body': ''}
+            self._connection = None
+            self.device_name = self._protocol.name
+
+        def _push_status(self):
+            self.data['status'] = self._status
+
+        def _do_action(self, data):
+            with self._device_lock:
+                self._actions[data['action']](data)
+                time.sleep(self._protocol.commandDelay)
+
+    class ScaleDriver(SerialDriver):
+        last_sent_value = None
+
+        def __init__(self, identifier, device):
+            super().__init__(identifier, device)
+            self._set_actions()
+
+        def _set_actions(self):
+            self._actions.update({'read_once': self._read_once_action})
+
+        def _read_once_action(self, data):
+            if self._connection:
+                self._read_weight()
+
+    class Controller:
+        pass
+
+    def route(*args, **kwargs):
+        return lambda method: method
+
+    modules = {
+        'odoo.http': {'Controller': Controller, 'route': route, 'Response': None},
+        'odoo': {},
+        'odoo.addons': {},
+        'odoo.addons.iot_drivers': {},
+        'odoo.addons.iot_drivers.event_manager': {'event_manager': event_manager},
+        'odoo.addons.iot_drivers.iot_handlers': {},
+        'odoo.addons.iot_drivers.iot_handlers.drivers': {},
+        'odoo.addons.iot_drivers.iot_handlers.drivers.serial_base_driver': {
+            'SerialProtocol': SerialProtocol, 'serial_connection': serial_connection, 'SerialDriver': SerialDriver},
+        'odoo.addons.iot_drivers.iot_handlers.drivers.serial_scale_driver': {'ScaleDriver': ScaleDriver},
+    }
+    for name, attributes in modules.items():
+        module = types.ModuleType(name)
+        module.__path__ = []
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+    sys.modules['odoo'].http = sys.modules['odoo.http']
+    sys.modules['odoo.addons.iot_drivers.iot_handlers.drivers.cpwplus_protocol'] = cpwplus_protocol
+
+
+def load_driver_module():
+    try:
+        from odoo.addons.iot_drivers.event_manager import event_manager
+    except ImportError:
+        install_odoo_stubs()
+        from odoo.addons.iot_drivers.event_manager import event_manager
+    if not isinstance(event_manager, RecordingEventManager):
+        sys.exit('bench_e2e.py needs the stand-in event_manager; run it off the IoT Box')
+    spec = importlib.util.spec_from_file_location('AdamCPWplusDriver', os.path.join(HERE, 'AdamCPWplusDriver.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module, event_manager
+
+
+# ----------------------------------------------------------------------
+# Instrumentation
+# ----------------------------------------------------------------------
+class TimedScale(FakeScale):
+    """FakeScale that changes its weight with every frame, so each event can
+    be traced back to one frame, and records when each frame was sent."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.sent = {}  # weight -> (first byte, last byte) in perf_counter time
+        self._next_weight = 1.0
+
+    def frame(self, command=b'G'):
+        self.weight = self._next_weight
+        self._next_weight = round(self._next_weight + 0.01, 2)
+        return super().frame(command)
+
+    def _send(self, payload):
+        first = now()
+        super()._send(payload)
+        self.sent[round(self.weight, 2)] = (first, now())
+
+
+class Timeline:
+    """Per-weight timestamps collected from the driver's hooks."""
+
+    def __init__(self):
+        self.marks = collections.defaultdict(dict)
+        self.last_write = None
+        self.last_frame = None
+        self.take_measure = None
+
+    def instrument(self, driver):
+        timeline = self
+        reader_class = type(driver._frame_reader)
+
+        class TimedFrameReader(reader_class):
+            __slots__ = ()
+
+            def read_frame(self, connection, timeout=None):
+                frame = super().read_frame(connection, timeout)
+                timeline.last_frame = now()
+                return frame
+
+        reader = driver._frame_reader
+        driver._frame_reader = TimedFrameReader(reader.terminator, byte_time=reader.byte_time, valid=reader.valid)
+
+        parse_reading = driver._parse_reading
+
+        def timed_parse(answer):
+            start = now()
+            if driver._protocol.measureCommand:
+                frame_time = timeline.last_frame
+            else:
+                frame_time = start  # called straight from the stream reader
+            reading = parse_reading(answer)
+            end = now()
+            if reading is not None:
+                marks = timeline.marks[round(reading.weight, 2)]
+                marks.setdefault('write', timeline.last_write)
+                marks.setdefault('frame', frame_time)
+                marks.setdefault('parse_start', start)
+                marks.setdefault('parse_end', end)
+            return reading
+
+        driver._parse_reading = timed_parse
+
+    def wrap_connection(self, connection):
+        write = connection.write
+
+        def timed_write(data):
+            self.last_write = now()
+            return write(data)
+
+        connection.write = timed_write
+
+
+def stages(scale, timeline, events, streaming):
+    """Turn the collected timestamps into per-stage samples (seconds)."""
+    samples = collections.defaultdict(list)
+    for event_time, weight, measured in events:
+        marks = timeline.marks.get(weight)
+        sent = scale.sent.get(weight)
+        if not marks or not sent:
+            continue
+        first_byte = sent[0]
+        samples['first_byte_to_frame'].append(marks['frame'] - first_byte)
+        samples['parse'].append(marks['parse_end'] - marks['parse_start'])
+        if streaming:
+            samples['wait_for_poll'].append(measured - marks['parse_end'])
+            samples['dispatch'].append(event_time - measured)
+            samples['total'].append(event_time - first_byte)
+        else:
+            start = marks['write']
+            if measured is not None:
+                # read_once: measured is when action() was called
+                samples['queue'].append(marks['write'] - measured)
+                start = measured
+            samples['write_to_first_byte'].append(first_byte - marks['write'])
+            samples['dispatch'].append(event_time - marks['parse_end'])
+            samples['total'].append(event_time - start)
+    return {name: {key: round(value * 1e3, 3) if key != 'count' else value
+                   for key, value in summary(values).items()}
+            for name, values in samples.items()}
+
+
+# ----------------------------------------------------------------------
+# Scenarios
+# ----------------------------------------------------------------------
+def make_driver(module, protocol, port):
+    class BenchDriver(module.AdamCPWplusDriver):
+        _protocol = protocol
+
+    driver = BenchDriver(port, {})
+    # Every frame carries a new weight; publish each one
+    driver._change_filter = cpwplus_protocol.ChangeFilter()
+    # Measure the live path as seen by a POS session on the weighing screen
+    driver._start_reading_action({'session_id': 'bench'})
+    driver._connection = driver._connections.get()
+    driver._status = {'status': driver.STATUS_CONNECTED, 'message_title': '', 'message_body': ''}
+    return driver
+
+
+def run_polling(module, event_manager, options, samples, action):
+    timeline = Timeline()
+    events = []
+    with TimedScale(**options) as scale:
+        driver = make_driver(module, module.CPWplusProtocol, scale.port)
+        timeline.instrument(driver)
+        timeline.wrap_connection(driver._connection)
+
+        called = {}
+        acked = threading.Event()
+
+        def listener(event_time, event):
+            if isinstance(event['result'], float) and action == bool(event.get('action')):
+                events.append((event_time, round(event['result'], 2), called.get(event.get('sample'))))
+                acked.set()
+
+        event_manager.listener = listener
+        if action:
+            # read_once is queued to the I/O thread, which polls on its own
+            # in between like it does while POS is on the weighing screen
+            driver.start()
+        for sample in range(samples):
+            if action:
+                acked.clear()
+                called[sample] = now()
+                driver.action({'action': 'read_once', 'session_id': 'bench', 'max_age': 0, 'sample': sample})
+                acked.wait(1)
+            else:
+                driver._take_measure()
+            time.sleep(0.01)
+        event_manager.listener = None
+        if action:
+            driver.disconnect()
+            driver.join(2)
+        driver._connections.close()
+        return stages(scale, timeline, events, streaming=False)
+
+
+def run_streaming(module, event_manager, options, samples):
+    timeline = Timeline()
+    events = []
+    with TimedScale(stream=STREAM_INTERVAL, **options) as scale:
+        driver = make_driver(module, module.CPWplusStreamProtocol, scale.port)
+        timeline.instrument(driver)
+
+        def listener(event_time, event):
+            if isinstance(event['result'], float):
+                events.append((event_time, round(event['result'], 2), timeline.take_measure))
+
+        event_manager.listener = listener
+        driver._take_measure()  # starts the stream reader
+        deadline = now() + samples * driver._protocol.newMeasureDelay
+        while now() < deadline:
+            time.sleep(driver._protocol.newMeasureDelay)
+            timeline.take_measure = now()
+            driver._take_measure()
+        event_manager.listener = None
+        driver.disconnect()
+        driver._connections.close()
+        driver._stream_thread.join(1)
+        return stages(scale, timeline, events, streaming=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--samples', type=int, default=100, help='readings per scenario (default 100)')
+    parser.add_argument('--latency', type=float, default=20, help='scale reply latency in ms (default 20)')
+    parser.add_argument('--jitter', type=float, default=10, help='extra random reply latency in ms (default 10)')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    module, event_manager = load_driver_module()
+    options = {'latency': args.latency / 1e3, 'jitter': args.jitter / 1e3}
+    report = {
+        'python': platform.python_version(),
+        'machine': '{} {}'.format(platform.system(), platform.machine()),
+        'samples': args.samples,
+        'scale': {'latency_ms': args.latency, 'jitter_ms': args.jitter, 'stream_interval_ms': STREAM_INTERVAL * 1e3},
+        'driver': {name: getattr(module, name) for name in ('CPW_WAIT_FOR_READY', 'CPW_TRANSMISSION_MODE')},
+        'unit': 'ms',
+        'scenarios': {
+            'polling': run_polling(module, event_manager, options, args.samples, action=False),
+            'action_read_once': run_polling(module, event_manager, options, args.samples, action=True),
+            'streaming': run_streaming(module, event_manager, options, args.samples),
+        },
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
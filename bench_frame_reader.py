@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: byte-at-a-time frame loop vs cpwplus_protocol.FrameReader.
+
+Runs both readers against a PTY fake scale (cpwplus_simulator.FakeScale) and
+reports, per frame, the syscalls issued on the read path (counted by
+wrapping os.read/os.readv/select.select/fcntl.ioctl, which is what pyserial
+and FrameReader call) and the buffer objects created: every read() result
+and every ``answer += byte`` copy for the old loop, every memoryview slice
+handed to readv() plus the returned frame for FrameReader.
+
+Usage:
+    python3 bench_frame_reader.py [frames]
+
+Requirements:
+    pip install pyserial   (Linux/macOS — needs a PTY)
+"""
+
+import collections
+import fcntl
+import os
+import select
+import sys
+import time
+
+import serial
+
+from cpwplus_protocol import FrameReader
+from cpwplus_simulator import FakeScale
+
+SETTLE = 0.1  # stands in for measureDelay; long enough for a full reply
+
+
+def legacy_read(connection):
+    """The _read_weight loop this benchmark was written to replace."""
+    answer = b''
+    while len(answer) < 40:
+        byte = connection.read(1)
+        if not byte:
+            break
+        answer += byte
+        if answer.endswith(b'\r\n'):
+            break
+    return answer
+
+
+class SyscallCounter:
+    """Count calls to the syscall wrappers used on the serial read path."""
+
+    TARGETS = ((os, 'read'), (os, 'readv'), (select, 'select'), (fcntl, 'ioctl'))
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self._saved = []
+
+    def __enter__(self):
+        for module, name in self.TARGETS:
+            original = getattr(module, name)
+            self._saved.append((module, name, original))
+            setattr(module, name, self._wrap(name, original))
+        return self
+
+    def __exit__(self, *exc):
+        for module, name, original in self._saved:
+            setattr(module, name, original)
+        self._saved = []
+
+    def _wrap(self, name, original):
+        def counted(*args, **kwargs):
+            self.counts[name] += 1
+            return original(*args, **kwargs)
+        return counted
+
+
+def run(read, connection, frames, settle):
+    """Poll ``frames`` times; return (syscall counts, buffers, seconds reading)."""
+    buffers = 0
+    elapsed = 0.0
+    calls = collections.Counter()
+    for _ in range(frames):
+        connection.write(b'G\r\n')
+        time.sleep(settle)
+        with SyscallCounter() as counter:
+            start = time.perf_counter()
+            frame = read(connection)
+            elapsed += time.perf_counter() - start
+        assert frame.endswith(b'\r\n'), frame
+        calls.update(counter.counts)
+        if read is legacy_read:
+            buffers += 2 * counter.counts['read']
+        else:
+            buffers += counter.counts['readv'] + 1
+    return calls, buffers, elapsed
+
+
+def report(label, frames, calls, buffers, elapsed):
+    total = sum(calls.values())
+    detail = ', '.join('{} {:.1f}'.format(name, count / frames) for name, count in sorted(calls.items()))
+    print('  {:<24} {:6.1f} syscalls/frame ({})'.format(label, total / frames, detail))
+    print('  {:<24} {:6.1f} buffers/frame, {:7.1f} us/frame reading'.format(
+        '', buffers / frames, elapsed / frames * 1e6))
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with FakeScale() as scale:
+        connection = serial.Serial(scale.port, baudrate=9600, timeout=1, writeTimeout=1)
+        reader = FrameReader()
+        paced = FrameReader(byte_time=scale.byte_time)
+        frame_size = len(scale.frame())
+        print('CPWplus frame reader benchmark — {} frames of {} bytes via {}'.format(
+            frames, frame_size, scale.port))
+        for settle, title in ((SETTLE, 'reply already queued (after measureDelay)'),
+                              (0.0, 'reading while the reply is on the wire')):
+            print('\n{}:'.format(title))
+            report('byte-at-a-time loop', frames, *run(legacy_read, connection, frames, settle))
+            report('FrameReader', frames, *run(reader.read_frame, connection, frames, settle))
+            report('FrameReader(byte_time)', frames, *run(paced.read_frame, connection, frames, settle))
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
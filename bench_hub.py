@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Load test: one polling thread per scale vs one PollHub for all of them.
+
+Starts N PTY fake scales (cpwplus_simulator.FakeScale, in a child process
+so their CPU time is not counted) and polls all of them at the same rate
+for a few seconds, the way AdamCPWplusDriver does in each mode:
+
+    threads   one thread per scale: write G, FrameReader.read_frame(),
+              parse_frame(), sleep until the next poll  (default mode)
+    hub       cpwplus_protocol.PollHub on one asyncio loop, each scale an
+              AsyncFramePort watched with add_reader  (CPW_HUB_MODE)
+
+For each N it reports the CPU used by the polling process (user + system,
+as a percentage of one core), the poll latency from writing G to holding
+the parsed reading, the poll rate each scale actually got, and for the
+hub how late the most overdue poll started.
+
+Usage:
+    python3 bench_hub.py [max_scales] [seconds_per_run] [poll_interval_ms]
+
+Requirements:
+    pip install pyserial   (Linux/macOS — needs a PTY)
+"""
+
+import asyncio
+import multiprocessing
+import resource
+import sys
+import threading
+import time
+
+import serial
+
+from benchlib import summary
+from cpwplus_protocol import AsyncFramePort, FrameReader, PollHub, parse_frame
+from cpwplus_simulator import FakeScale
+
+COMMAND = b'G\r\n'
+MEASURE_DELAY = 0.5  # CPWplusProtocol.measureDelay
+MAX_IN_FLIGHT = 4  # CPW_HUB_MAX_IN_FLIGHT
+BUDGET = 0.1  # CPW_HUB_LATENCY_BUDGET
+
+
+def serve_scales(count, pipe):
+    """Child process: run ``count`` fake scales until the parent says stop."""
+    scales = [FakeScale().start() for _ in range(count)]
+    pipe.send([scale.port for scale in scales])
+    pipe.recv()
+    for scale in scales:
+        scale.stop()
+
+
+def open_port(port):
+    return serial.Serial(port, baudrate=9600, timeout=1, writeTimeout=1)
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_threads(ports, seconds, interval):
+    latencies = []
+    polls = [0] * len(ports)
+    stop = threading.Event()
+
+    def poll_forever(index, port):
+        reader = FrameReader(byte_time=10.0 / 9600)
+        with open_port(port) as connection:
+            while not stop.is_set():
+                start = time.perf_counter()
+                connection.write(COMMAND)
+                reading = parse_frame(reader.read_frame(connection, timeout=MEASURE_DELAY))
+                latencies.append(time.perf_counter() - start)
+                polls[index] += reading is not None
+                stop.wait(interval)
+
+    threads = [threading.Thread(target=poll_forever, args=item) for item in enumerate(ports)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, polls, None
+
+
+class Member:
+    """A PollHub member doing what AdamCPWplusDriver.poll() does on the wire."""
+
+    budget = BUDGET
+
+    def __init__(self, port, interval, latencies):
+        self.port = port
+        self.interval = interval
+        self.latencies = latencies
+        self.polls = 0
+        self.stopped = False
+
+    async def poll(self):
+        if self.stopped:
+            return None
+        start = time.perf_counter()
+        reading = parse_frame(await self.port.request(COMMAND, MEASURE_DELAY))
+        self.latencies.append(time.perf_counter() - start)
+        self.polls += reading is not None
+        return self.interval
+
+
+def run_hub(ports, seconds, interval):
+    latencies = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        hub = PollHub(loop, max_in_flight=MAX_IN_FLIGHT)
+        connections = [open_port(port) for port in ports]
+        members = [Member(AsyncFramePort(connection, loop, byte_time=10.0 / 9600), interval, latencies) for connection in connections]
+        done = [hub.add(member) for member in members]
+        await asyncio.sleep(seconds)
+        for member in members:
+            member.stopped = True
+            hub.wake(member)
+        await asyncio.gather(*done)
+        for member, connection in zip(members, connections):
+            member.port.close()
+            connection.close()
+        return [member.polls for member in members], hub.stats()
+
+    polls, stats = asyncio.run(main())
+    return latencies, polls, stats
+
+
+def measure(mode, ports, seconds, interval):
+    wall, cpu = time.perf_counter(), cpu_seconds()
+    latencies, polls, stats = mode(ports, seconds, interval)
+    wall, cpu = time.perf_counter() - wall, cpu_seconds() - cpu
+    lat = summary(latencies)
+    line = '  {:<7} {:>3} scales  cpu {:5.1f}%  latency p50 {:5.1f} p95 {:5.1f} p99 {:5.1f} ms  {:5.1f}-{:5.1f} polls/s/scale'.format(
+        'hub' if stats else 'threads', len(ports), cpu / wall * 100,
+        lat['p50'] * 1e3, lat['p95'] * 1e3, lat['p99'] * 1e3,
+        min(polls) / seconds, max(polls) / seconds)
+    if stats:
+        line += '  late <= {} ms, {} over budget'.format(stats['max_lateness_ms'], stats['budget_misses'])
+    print(line)
+
+
+def main():
+    max_scales = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    interval = float(sys.argv[3]) / 1e3 if len(sys.argv) > 3 else 0.1
+    print('polling every {:g} ms for {:g} s per run; hub: {} in flight, {:g} ms budget'.format(
+        interval * 1e3, seconds, MAX_IN_FLIGHT, BUDGET * 1e3))
+    count = 1
+    while count <= max_scales:
+        parent, child = multiprocessing.Pipe()
+        simulator = multiprocessing.Process(target=serve_scales, args=(count, child), daemon=True)
+        simulator.start()
+        ports = parent.recv()
+        for mode in (run_threads, run_hub):
+            measure(mode, ports, seconds, interval)
+        parent.send('stop')
+        simulator.join()
+        count *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Startup/recovery benchmark: fixed 0.5 s line settle vs adaptive settle.
+
+Replays, against a PTY fake scale, the serial steps AdamCPWplusDriver takes
+when it probes a port in supported() and when it opens (or, after an error,
+reopens) its connection, before and after the fixed sleep in
+_disable_flow_control() was replaced by cpwplus_protocol.wait_for_response():
+
+    probe   old: drop DTR/RTS, sleep 0.5, write G, sleep commandDelay, read(30)
+            new: drop DTR/RTS, write G once, read until the first valid frame
+    open    old: open port, drop DTR/RTS, sleep 0.5
+            new: open port, drop DTR/RTS, poll with G until the first valid frame
+
+PTYs have no modem lines, so setting DTR/RTS is a no-op here; on an FTDI
+adapter add the time the real ioctls take to both columns.
+
+Usage:
+    python3 bench_line_settle.py [runs] [scale_latency_ms]
+
+Requirements:
+    pip install pyserial   (Linux/macOS — needs a PTY)
+"""
+
+import statistics
+import sys
+import time
+
+import serial
+
+from cpwplus_protocol import looks_like_cpwplus, wait_for_response
+from cpwplus_simulator import FakeScale
+
+COMMAND_DELAY = 0.2  # CPWplusProtocol.commandDelay
+SETTLE_MAX = 0.5  # the old fixed sleep, now CPW_LINE_SETTLE_MAX
+PROBING_TIMEOUT = 1  # serial_connection(..., is_probing=True)
+
+# PTYs reject the modem-line ioctls; skip them like a port without DTR/RTS
+serial.Serial._update_dtr_state = lambda self: None
+serial.Serial._update_rts_state = lambda self: None
+
+
+def open_port(port, timeout):
+    return serial.Serial(port, baudrate=9600, timeout=timeout, writeTimeout=timeout)
+
+
+def drop_lines(connection):
+    connection.dtr = False
+    connection.rts = False
+
+
+def old_probe(port):
+    with open_port(port, PROBING_TIMEOUT) as connection:
+        drop_lines(connection)
+        time.sleep(SETTLE_MAX)
+        connection.write(b'G\r\n')
+        time.sleep(COMMAND_DELAY)
+        return looks_like_cpwplus(connection.read(30))
+
+
+def new_probe(port):
+    with open_port(port, PROBING_TIMEOUT) as connection:
+        drop_lines(connection)
+        answer = wait_for_response(connection, b'G\r\n', timeout=SETTLE_MAX, retries=0)
+        if not looks_like_cpwplus(answer):
+            answer += wait_for_response(connection, timeout=COMMAND_DELAY)
+        return looks_like_cpwplus(answer)
+
+
+def old_open(port):
+    connection = open_port(port, 1)
+    drop_lines(connection)
+    time.sleep(SETTLE_MAX)
+    connection.close()
+    return True
+
+
+def new_open(port):
+    connection = open_port(port, 1)
+    drop_lines(connection)
+    found = looks_like_cpwplus(wait_for_response(connection, b'G\r\n', timeout=SETTLE_MAX))
+    connection.close()
+    return found
+
+
+def timed(step, port, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        if not step(port):
+            raise RuntimeError('{} did not see the scale'.format(step.__name__))
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    latency = float(sys.argv[2]) / 1e3 if len(sys.argv) > 2 else 0.02
+    with FakeScale(latency=latency) as scale:
+        print('median of {} runs, scale answers after {:g} ms'.format(runs, latency * 1e3))
+        print('  {:<28} {:>9} {:>9} {:>9}'.format('', 'old', 'new', 'saved'))
+        for label, old, new in (('probe (supported)', old_probe, new_probe),
+                                ('open / reopen (run, action)', old_open, new_open)):
+            before, after = timed(old, scale.port, runs), timed(new, scale.port, runs)
+            print('  {:<28} {:>7.0f}ms {:>7.0f}ms {:>7.0f}ms'.format(
+                label, before * 1e3, after * 1e3, (before - after) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
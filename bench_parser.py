@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Parser benchmark: two re.search() calls per frame vs parse_frame().
+
+Times the weight parsing the driver used to do in _read_weight (measure
+regex, then a second sign regex) against cpwplus_protocol.parse_frame()
+on a mix of real-world CPWplus frames.  No serial port needed — run it on
+the IoT Box itself to get Pi-class numbers:
+
+    scp bench_parser.py cpwplus_protocol.py pi@<IP>:/tmp/
+    ssh pi@<IP> 'cd /tmp && python3 bench_parser.py'
+
+Usage:
+    python3 bench_parser.py [seconds_per_parser]
+"""
+
+import platform
+import re
+import sys
+import time
+
+from cpwplus_protocol import parse_frame
+
+OLD_MEASURE_REGEXP = rb"(?:[GN]/W\s*)?[+-]\s*([0-9.]+)\s+(?:lb|kg|oz)"
+OLD_SIGN_REGEXP = rb"(?:[GN]/W\s*)?(-)\s*[0-9.]"
+
+FRAMES = (
+    b'G/W  +    0.58 lb\r\n',
+    b'+  0.12  lb\r\n',
+    b'N/W  -    1.50 lb\r\n',
+    b'G/W  +   12.34 kg\r\n',
+    b'G/W  +    0.00 lb\r\n',
+    b'\x00\xffG/W  +    3.10 lb\r\n',
+)
+
+
+def old_parse(answer):
+    match = re.search(OLD_MEASURE_REGEXP, answer)
+    if match:
+        weight = float(match.group(1))
+        if re.search(OLD_SIGN_REGEXP, answer):
+            weight = -weight
+        return weight
+    return None
+
+
+def new_parse(answer):
+    reading = parse_frame(answer)
+    return None if reading is None else reading.weight
+
+
+def rate(parse, seconds):
+    """Return parses per second of ``parse`` over the sample frames."""
+    frames = FRAMES * 100
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for frame in frames:
+            parse(frame)
+        count += len(frames)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    for frame in FRAMES:
+        assert old_parse(frame) == new_parse(frame), frame
+    print('{} {} — Python {}'.format(platform.system(), platform.machine(), platform.python_version()))
+    old = rate(old_parse, seconds)
+    new = rate(new_parse, seconds)
+    print('  two re.search() calls   {:>10,.0f} parses/s  ({:.2f} us each)'.format(old, 1e6 / old))
+    print('  parse_frame()           {:>10,.0f} parses/s  ({:.2f} us each, also unit/net/status)'.format(
+        new, 1e6 / new))
+    print('  speed-up                {:>10.2f}x'.format(new / old))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Discovery benchmark: probing ports one after another vs ParallelProber.
+
+Sets up a mix of PTY fake scales and silent ports (standing in for a
+receipt printer or customer display that ignores ``G``) and asks about each
+port in turn, as the IoT framework does with supported():
+
+    sequential   each question runs the probe on that port
+    parallel     cpwplus_protocol.ParallelProber: the first question starts
+                 probes on every port, later ones pick up their result
+
+The probe is the one from bench_line_settle.py (same steps as
+AdamCPWplusDriver._probe).
+
+Usage:
+    python3 bench_probing.py [scales] [silent_ports]
+
+Requirements:
+    pip install pyserial   (Linux/macOS — needs a PTY)
+"""
+
+import contextlib
+import os
+import sys
+import time
+import tty
+
+from bench_line_settle import new_probe
+from cpwplus_protocol import ParallelProber
+from cpwplus_simulator import FakeScale
+
+
+@contextlib.contextmanager
+def silent_port():
+    """A PTY nobody answers on."""
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    try:
+        yield os.ttyname(slave)
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def discover(ports, supported):
+    start = time.perf_counter()
+    found = [port for port in ports if supported(port)]
+    return time.perf_counter() - start, found
+
+
+def main():
+    scales = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    silent = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    with contextlib.ExitStack() as stack:
+        ports = [stack.enter_context(FakeScale()).port for _ in range(scales)]
+        ports += [stack.enter_context(silent_port()) for _ in range(silent)]
+        print('{} ports: {} fake scales, {} silent'.format(len(ports), scales, silent))
+
+        elapsed, found = discover(ports, new_probe)
+        print('  sequential  {:7.0f} ms  ({} CPWplus found)'.format(elapsed * 1e3, len(found)))
+
+        # The fake scales' PTYs are open in this process, so don't let the
+        # prober skip them as in use
+        prober = ParallelProber(new_probe, candidates=lambda: ports, in_use=set)
+        elapsed, found = discover(ports, prober.result)
+        print('  parallel    {:7.0f} ms  ({} CPWplus found)'.format(elapsed * 1e3, len(found)))
+
+
+if __name__ == '__main__':
+    main()
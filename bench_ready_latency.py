@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Latency benchmark: fixed measureDelay sleep vs waiting for the reply.
+
+Polls a PTY fake scale (cpwplus_simulator.FakeScale, paced at 9600 baud)
+the way AdamCPWplusDriver._read_weight does in each mode and prints a
+histogram of the time from writing ``G\\r\\n`` to holding a complete frame:
+
+    sleep   CPW_WAIT_FOR_READY = False: sleep measureDelay, then read
+    ready   CPW_WAIT_FOR_READY = True:  select() on the port, measureDelay
+            as the upper bound, stop at the \\r\\n terminator
+
+Usage:
+    python3 bench_ready_latency.py [polls] [scale_latency_ms] [jitter_ms]
+
+Requirements:
+    pip install pyserial   (Linux/macOS — needs a PTY)
+"""
+
+import sys
+import time
+
+import serial
+
+from benchlib import print_histogram, summary
+from cpwplus_protocol import FrameReader
+from cpwplus_simulator import FakeScale
+
+MEASURE_DELAY = 0.5  # CPWplusProtocol.measureDelay
+EDGES_MS = (20, 30, 40, 50, 75, 100, 250, 500, 525, 550)
+
+
+def poll(connection, reader, wait_for_ready):
+    start = time.perf_counter()
+    connection.write(b'G\r\n')
+    if wait_for_ready:
+        frame = reader.read_frame(connection, timeout=MEASURE_DELAY)
+    else:
+        time.sleep(MEASURE_DELAY)
+        frame = reader.read_frame(connection)
+    elapsed = time.perf_counter() - start
+    if not frame.endswith(b'\r\n'):
+        raise RuntimeError('incomplete frame {!r}'.format(frame))
+    return elapsed
+
+
+def main():
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = float(sys.argv[2]) / 1e3 if len(sys.argv) > 2 else 0.02
+    jitter = float(sys.argv[3]) / 1e3 if len(sys.argv) > 3 else 0.03
+    with FakeScale(latency=latency, jitter=jitter) as scale:
+        connection = serial.Serial(scale.port, baudrate=9600, timeout=1, writeTimeout=1)
+        reader = FrameReader(byte_time=10.0 / 9600)
+        print('write -> frame latency, {} polls, scale answers after {:g}-{:g} ms + {:.1f} ms on the wire'.format(
+            polls, latency * 1e3, (latency + jitter) * 1e3, len(scale.frame()) * scale.byte_time * 1e3))
+        for label, wait_for_ready in (('sleep (measureDelay)', False), ('ready (select on fd)', True)):
+            samples = [poll(connection, reader, wait_for_ready) for _ in range(polls)]
+            stats = summary(samples)
+            print('\n{}: p50 {:.1f} ms, p95 {:.1f} ms, p99 {:.1f} ms, max {:.1f} ms'.format(
+                label, stats['p50'] * 1e3, stats['p95'] * 1e3, stats['p99'] * 1e3, stats['max'] * 1e3))
+            print_histogram(samples, EDGES_MS)
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
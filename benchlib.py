@@ -0,0 +1,40 @@
+"""Small statistics helpers shared by the bench_*.py scripts."""
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of ``samples`` (``fraction`` in 0..1)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return float('nan')
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summary(samples):
+    """Return a dict of count/min/p50/p95/p99/max for ``samples``."""
+    return {
+        'count': len(samples),
+        'min': min(samples) if samples else float('nan'),
+        'p50': percentile(samples, 0.50),
+        'p95': percentile(samples, 0.95),
+        'p99': percentile(samples, 0.99),
+        'max': max(samples) if samples else float('nan'),
+    }
+
+
+def print_histogram(samples, edges, unit='ms', scale=1e3, width=40):
+    """Print an ASCII histogram of ``samples`` bucketed by ``edges``
+    (upper bounds in ``unit``); values past the last edge get their own row."""
+    counts = [0] * (len(edges) + 1)
+    for sample in samples:
+        value = sample * scale
+        for index, edge in enumerate(edges):
+            if value <= edge:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+    peak = max(counts) or 1
+    labels = ['<= {:g} {}'.format(edge, unit) for edge in edges] + ['>  {:g} {}'.format(edges[-1], unit)]
+    for label, count in zip(labels, counts):
+        print('  {:>12} | {:<{width}} {}'.format(label, '#' * round(count / peak * width), count, width=width))
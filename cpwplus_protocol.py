@@ -0,0 +1,1401 @@
+# -*- coding: utf-8 -*-
+# Part of Henderson Farm Store IoT configuration.
+# License: LGPL-3 (matching Odoo's IoT handler license)
+#
+# Odoo-independent helpers for the Adam CPWplus RS-232 protocol.
+# Shared by AdamCPWplusDriver.py (deployed next to it on the IoT Box) and
+# the standalone scripts in this repository, so it must only depend on the
+# standard library and pyserial.
+
+import asyncio
+import bisect
+import collections
+import errno
+import glob
+import io
+import json
+import logging
+import os
+import re
+import select
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+_logger = logging.getLogger(__name__)
+
+FRAME_TERMINATOR = b'\r\n'
+FRAME_MAX_SIZE = 40
+
+# One pass over a weight frame such as b'G/W  +   0.58 lb\r\n'.  The G/W or
+# N/W prefix is optional (some firmware sends just b'+  0.58  lb'), and so
+# is the ST/US stable/unstable (or OL overload) status that some Adam
+# firmware puts in front of it.
+#   1: status   2: G or N   3: sign   4: magnitude   5: unit
+FRAME_REGEXP = re.compile(rb"(?:(ST|US|OL)\s*,\s*)?(?:([GN])/W\s*)?([+-])\s*([0-9.]+)\s+(lb|kg|oz)")
+
+
+class WeightReading:
+    """One parsed CPWplus weight frame.
+
+    ``net`` and ``stable`` are None when the frame does not say.
+    """
+
+    __slots__ = ('weight', 'unit', 'net', 'stable', 'overload')
+
+    def __init__(self, weight, unit, net=None, stable=None, overload=False):
+        self.weight = weight
+        self.unit = unit
+        self.net = net
+        self.stable = stable
+        self.overload = overload
+
+    def __repr__(self):
+        return 'WeightReading(weight={!r}, unit={!r}, net={!r}, stable={!r}, overload={!r})'.format(
+            self.weight, self.unit, self.net, self.stable, self.overload)
+
+
+class WeightSnapshot(collections.namedtuple('WeightSnapshot', 'sequence time weight unit stable overload')):
+    """One published weight, as the I/O path last read it.
+
+    Immutable, so a reader that got hold of it -- one attribute load, no
+    lock -- sees a consistent reading while the next one is being taken.
+    ``sequence`` goes up by one per publication and ``time`` is its
+    time.monotonic().  After a failed poll ``weight`` is the last known one
+    and ``stable`` is False.
+    """
+
+    __slots__ = ()
+
+    def age(self, now=None):
+        return (time.monotonic() if now is None else now) - self.time
+
+
+NO_SNAPSHOT = WeightSnapshot(0, float('-inf'), None, None, False, False)
+
+
+def parse_frame(frame, _search=FRAME_REGEXP.search):
+    """Parse sign, gross/net, magnitude, unit and status from ``frame``.
+
+    Returns a WeightReading, or None if the frame holds no weight.
+    """
+    match = _search(frame)
+    if match is None:
+        return None
+    status, kind, sign, magnitude, unit = match.groups()
+    try:
+        weight = float(magnitude)
+    except ValueError:  # e.g. a lone '.' from a garbled frame
+        return None
+    if sign == b'-':
+        weight = -weight
+    return WeightReading(
+        weight,
+        unit.decode('ascii'),
+        net=None if kind is None else kind == b'N',
+        stable=None if status is None else status == b'ST',
+        overload=status == b'OL',
+    )
+
+
+def looks_like_cpwplus(answer):
+    """True if a probe response carries a CPWplus signature."""
+    return b'G/W' in answer or b'N/W' in answer or parse_frame(answer) is not None
+
+
+def connection_fileno(connection):
+    """Return the OS file descriptor behind a serial connection, or None
+    when the connection does not expose one (e.g. pyserial on Windows)."""
+    try:
+        return connection.fileno()
+    except (AttributeError, io.UnsupportedOperation, serial.SerialException):
+        return None
+
+
+class FrameReader:
+    """Bulk, terminator-aware reader for CPWplus response frames.
+
+    A frame is assembled in a preallocated buffer with as few syscalls as
+    the line allows: when the connection exposes a file descriptor we
+    select() for readability and readv() straight into the buffer,
+    otherwise we fall back to ``in_waiting``-sized ``read()`` calls.  With
+    the whole reply already queued this is one or two syscalls per frame,
+    instead of one per byte.
+
+    When the reader is used straight after sending a command, the reply is
+    still on the wire and would otherwise arrive a byte or two per
+    syscall.  Given ``byte_time`` (seconds per character on the line), the
+    reader sleeps through the expected remainder of the frame -- sized from
+    the previous complete frame -- before reading again.
+
+    If one read completes several frames, only the newest is returned.
+    Bytes received after its terminator are kept and returned first by the
+    next call, mirroring what a byte-at-a-time reader would have left in
+    the OS buffer.
+
+    Given ``valid`` (e.g. ``FRAME_REGEXP.search``), the reader also
+    resynchronises on the frame boundaries: complete lines ``valid``
+    rejects (the tail of a frame cut in half, line noise) are skipped and
+    reading goes on until the timeout, and a full buffer with no
+    terminator loses its older half instead of being returned as a frame.
+    Only when nothing valid arrives in time is the last rejected line
+    returned, so the caller still sees the garbage.  Dropped bytes,
+    including those thrown away by ``flush()``, are added to ``skipped``.
+    """
+
+    __slots__ = ('terminator', 'byte_time', 'valid', 'skipped', '_buffer', '_view', '_pending', '_expected')
+
+    def __init__(self, terminator=FRAME_TERMINATOR, size=FRAME_MAX_SIZE, byte_time=0.0, valid=None):
+        self.terminator = terminator
+        self.byte_time = byte_time
+        self.valid = valid
+        self.skipped = 0
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._pending = 0
+        self._expected = 0
+
+    def reset(self):
+        """Forget any bytes carried over from the previous frame."""
+        self.skipped += self._pending
+        self._pending = 0
+
+    def flush(self, connection):
+        """Drop carried-over bytes and whatever ``connection`` has already
+        received, so the next read starts with the reply to a fresh command
+        rather than a late or unsolicited one."""
+        self.reset()
+        waiting = connection.in_waiting
+        if waiting:
+            self.skipped += len(connection.read(waiting))
+
+    def has_frame(self):
+        """True when a complete frame is already buffered from the last read."""
+        return self._buffer.find(self.terminator, 0, self._pending) >= 0
+
+    def _take_frames(self, end):
+        """Pop the complete lines before ``end`` off the buffer; return the
+        newest one ``valid`` accepts, else (None, newest rejected line)."""
+        view, terminator = self._view, self.terminator
+        lines = bytes(view[:end])
+        self._pending -= end
+        if self._pending:
+            view[:self._pending] = bytes(view[end:end + self._pending])
+        if lines.find(terminator) == end - len(terminator):
+            # The usual case: a single line
+            if self.valid is None or self.valid(lines):
+                return lines, None
+            return None, lines
+        parts = lines.split(terminator)
+        del parts[-1]
+        frame = rejected = None
+        for part in reversed(parts):
+            line = part + terminator
+            if self.valid is None or self.valid(line):
+                frame = line
+                break
+            if rejected is None:
+                rejected = line
+        self.skipped += end - len(frame or rejected)
+        return frame, rejected
+
+    def read_frame(self, connection, timeout=None):
+        """Read one frame from ``connection``.
+
+        Returns the frame including its terminator, or whatever arrived
+        before ``timeout`` (default: the connection's own timeout) or before
+        the buffer filled up.  Returns ``b''`` when nothing arrived at all.
+        Without a file descriptor the timeout is only checked between reads,
+        each of which may block for the connection's own timeout.
+        """
+        if timeout is None:
+            timeout = connection.timeout
+        buffer, view, terminator = self._buffer, self._view, self.terminator
+        size = len(buffer)
+        fd = connection_fileno(connection)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        rejected = None
+        start = 0
+
+        while True:
+            length = self._pending
+            end = buffer.rfind(terminator, start, length)
+            if end >= 0:
+                end += len(terminator)
+                frame, last_rejected = self._take_frames(end)
+                if frame is not None:
+                    if rejected is not None:
+                        self.skipped += len(rejected)
+                    self._expected = len(frame)
+                    return frame
+                if rejected is not None:
+                    self.skipped += len(rejected)
+                rejected = last_rejected
+                length = self._pending
+            elif length == size:
+                if self.valid is None:
+                    break
+                # Garbage with no terminator: keep reading on the newer half
+                half = size // 2
+                view[:length - half] = bytes(view[half:length])
+                self._pending = length = length - half
+                self.skipped += half
+            start = max(length - len(terminator) + 1, 0)
+
+            if fd is None:
+                if deadline is not None and (length or rejected) and time.monotonic() >= deadline:
+                    break
+                chunk = connection.read(min(connection.in_waiting or 1, size - length))
+                count = len(chunk)
+                if not count:
+                    break
+                view[length:length + count] = chunk
+            else:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                if not select.select([fd], [], [], remaining)[0]:
+                    break
+                try:
+                    count = os.readv(fd, [view[length:]])
+                except OSError as e:
+                    if e.errno in (errno.EAGAIN, errno.EINTR):
+                        continue
+                    raise serial.SerialException('read failed: {}'.format(e)) from e
+                if not count:
+                    # Same condition pyserial reports for an unplugged adapter
+                    raise serial.SerialException(
+                        'device reports readiness to read but returned no data '
+                        '(device disconnected or multiple access on port?)')
+            length += count
+            self._pending = length
+            if buffer.find(terminator, start, length) < 0 and self.byte_time and self._expected > length:
+                wait = (self._expected - length) * self.byte_time
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                if wait > 0:
+                    time.sleep(wait)
+
+        partial = bytes(view[:self._pending])
+        self._pending = 0
+        if rejected is not None:
+            self.skipped += len(partial)
+            return rejected
+        return partial
+
+
+def wait_for_response(connection, command=None, timeout=0.5, resend_after=0.25, retries=None):
+    """Wait up to ``timeout`` seconds for a CPWplus frame on ``connection``.
+
+    Meant to replace a fixed settle sleep after the modem lines change:
+    ``command`` (if any) is written straight away and re-sent every
+    ``resend_after`` seconds, in case the adapter dropped it while the
+    lines settled, and we return as soon as a CPWplus frame arrives.
+    ``retries`` caps the re-sends (None: until ``timeout``; 0 when probing
+    a port that may belong to another device, which should see the
+    command only once).  If
+    the command had to be re-sent, the reply to the extra copy is read and
+    discarded so it cannot be mistaken for the answer to a later poll.
+
+    Returns everything read, or ``b''`` if the port stayed silent.
+    """
+    reader = FrameReader()
+    answer = b''
+    sent = 0
+    now = time.monotonic()
+    deadline = now + timeout
+    next_send = now
+    while now < deadline:
+        resend = command and (retries is None or sent <= retries)
+        if resend and now >= next_send:
+            connection.write(command)
+            sent += 1
+            next_send = now + resend_after
+            resend = retries is None or sent <= retries
+        until = min(deadline, next_send) if resend else deadline
+        answer += reader.read_frame(connection, timeout=max(until - now, 0))
+        if looks_like_cpwplus(answer):
+            if sent > 1:
+                reader.read_frame(connection, timeout=resend_after)
+            break
+        now = time.monotonic()
+    return answer
+
+
+_shared_loop = None
+_shared_loop_lock = threading.Lock()
+
+
+def shared_event_loop():
+    """Return the process-wide asyncio loop for CPWplus I/O, starting its
+    thread on first use.  Every scale driven through AsyncFramePort shares
+    this one loop (and thread)."""
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='CPWplus event loop', daemon=True).start()
+            _shared_loop = loop
+        return _shared_loop
+
+
+class AsyncFramePort:
+    """Frame-level asyncio access to an open serial connection.
+
+    The connection's file descriptor is registered with ``loop.add_reader``,
+    so bytes are read only when the OS says they are there and no thread
+    sleeps waiting for them.  Received bytes are split into frames at
+    ``terminator``; complete frames are queued for ``read_frame()``, or, if
+    ``on_frame`` is given (continuous-stream mode), handed to it -- only the
+    newest of the frames completed by one read, as older ones are already
+    out of date.
+
+    Like FrameReader, given ``byte_time`` the port stops watching the fd
+    for the expected remainder of a frame it has started receiving, so a
+    reply trickling in at 9600 baud costs a couple of wakeups, not one per
+    byte; and given ``valid`` it skips the lines ``valid`` rejects and
+    resynchronises after garbage, counting dropped bytes in ``skipped``.
+    ``read_frame()`` returns the newest queued frame.
+
+    Must be created and used from the loop's own thread.  Read errors are
+    raised as serial.SerialException from the next ``read_frame()``.
+    """
+
+    def __init__(self, connection, loop, terminator=FRAME_TERMINATOR, size=FRAME_MAX_SIZE, on_frame=None,
+                 byte_time=0.0, valid=None):
+        fd = connection_fileno(connection)
+        if fd is None:
+            raise ValueError('{!r} has no file descriptor to watch'.format(connection))
+        self.connection = connection
+        self.terminator = terminator
+        self._fd = fd
+        self._loop = loop
+        self._size = size
+        self._on_frame = on_frame
+        self.byte_time = byte_time
+        self.valid = valid
+        self.skipped = 0
+        self._expected = 0
+        self._paused = None
+        self._buffer = bytearray()
+        self._frames = collections.deque(maxlen=8)
+        self._rejected = None
+        self._waiter = None
+        self._error = None
+        loop.add_reader(fd, self._on_readable)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, 4096)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return
+            self._fail(serial.SerialException('read failed: {}'.format(e)))
+            return
+        if not data:
+            self._fail(serial.SerialException(
+                'device reports readiness to read but returned no data '
+                '(device disconnected or multiple access on port?)'))
+            return
+        buffer, terminator, valid = self._buffer, self.terminator, self.valid
+        start = max(len(buffer) - len(terminator) + 1, 0)
+        buffer += data
+        newest = None
+        end = buffer.find(terminator, start)
+        while end >= 0:
+            end += len(terminator)
+            line = bytes(buffer[:end])
+            del buffer[:end]
+            if valid is not None and not valid(line):
+                if self._rejected is not None:
+                    self.skipped += len(self._rejected)
+                self._rejected = line
+            else:
+                if newest is not None and self._on_frame is not None:
+                    self.skipped += len(newest)
+                newest = line
+                if self._on_frame is None:
+                    self._frames.append(newest)
+            end = buffer.find(terminator)
+        if len(buffer) >= self._size:
+            if valid is not None:
+                # Garbage with no terminator: keep reading on the newer half
+                half = self._size // 2
+                del buffer[:half]
+                self.skipped += half
+            else:
+                # No terminator in a full buffer: pass the garbage on as a frame
+                newest = bytes(buffer)
+                buffer.clear()
+                if self._on_frame is None:
+                    self._frames.append(newest)
+        if newest is None and self._rejected is not None and self._on_frame is not None:
+            # Streaming: hand over the garbage so the owner sees it
+            newest, self._rejected = self._rejected, None
+        if newest is None:
+            if self.byte_time and self._expected > len(buffer):
+                self._pause((self._expected - len(buffer)) * self.byte_time)
+            return
+        self._expected = len(newest)
+        if self._on_frame is not None:
+            self._on_frame(newest)
+        self._wake()
+
+    def _pause(self, seconds):
+        self._loop.remove_reader(self._fd)
+        self._paused = self._loop.call_later(seconds, self._resume)
+
+    def _resume(self):
+        self._paused = None
+        if self._fd is not None:
+            self._loop.add_reader(self._fd, self._on_readable)
+
+    def _fail(self, error):
+        self._error = error
+        self.close()
+        self._wake()
+
+    def _wake(self):
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def read_frame(self, timeout):
+        """Return the next frame, or whatever arrived before ``timeout``
+        seconds passed (``b''`` if nothing did)."""
+        if not self._frames and self._error is None:
+            # A plain timer rather than asyncio.wait_for(), which would cost
+            # an extra task per poll
+            self._waiter = self._loop.create_future()
+            timer = self._loop.call_later(timeout, self._wake)
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+                timer.cancel()
+        frames = self._frames
+        if frames:
+            frame = frames.pop()
+            while frames:
+                self.skipped += len(frames.pop())
+            if self._rejected is not None:
+                self.skipped += len(self._rejected)
+                self._rejected = None
+            return frame
+        if self._error is not None:
+            raise self._error
+        partial = bytes(self._buffer)
+        self._buffer.clear()
+        if self._rejected is not None:
+            self.skipped += len(partial)
+            partial, self._rejected = self._rejected, None
+        return partial
+
+    def discard(self):
+        """Drop queued frames and partial input, e.g. a stale reply."""
+        skipped = len(self._buffer)
+        for frame in self._frames:
+            skipped += len(frame)
+        if self._rejected is not None:
+            skipped += len(self._rejected)
+            self._rejected = None
+        self.skipped += skipped
+        self._frames.clear()
+        self._buffer.clear()
+
+    def write(self, data):
+        if self._error is not None:
+            raise self._error
+        self.connection.write(data)
+
+    async def request(self, command, timeout):
+        """Send ``command`` and return its reply frame (see read_frame)."""
+        self.discard()
+        self.write(command)
+        return await self.read_frame(timeout)
+
+    def close(self):
+        """Stop watching the connection; closing it is up to the owner."""
+        if self._paused is not None:
+            self._paused.cancel()
+            self._paused = None
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._fd = None
+
+
+class _Wakeup:
+    """Like asyncio.Event, but wait() takes a timeout without the extra
+    task asyncio.wait_for() would create on every call."""
+
+    __slots__ = ('_loop', '_set', '_waiter')
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._set = False
+        self._waiter = None
+
+    def set(self):
+        self._set = True
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def clear(self):
+        self._set = False
+
+    async def wait(self, timeout=None):
+        """Return once set() is called or ``timeout`` seconds have passed."""
+        if self._set:
+            return
+        self._waiter = self._loop.create_future()
+        timer = None if timeout is None else self._loop.call_later(timeout, self.set)
+        try:
+            await self._waiter
+        finally:
+            self._waiter = None
+            if timer is not None:
+                timer.cancel()
+
+
+class PollHub:
+    """Round-robin poller for many devices on one asyncio loop.
+
+    Members have a ``poll()`` coroutine that takes one measurement and
+    returns the seconds until the next one is due (None to leave the hub),
+    and a ``budget``: how many seconds past due a poll may start.  A single
+    scheduling coroutine starts due polls in rotation, at most
+    ``max_in_flight`` at a time, putting members that are already over
+    their budget first; so one busy or slow scale cannot starve the others,
+    and CPU bursts stay bounded however many scales are attached.
+
+    All methods must be called from the loop's thread.  ``polls``,
+    ``budget_misses`` and ``max_lateness`` describe the schedule so far.
+    """
+
+    def __init__(self, loop, max_in_flight=4):
+        self.max_in_flight = max_in_flight
+        self._loop = loop
+        self._members = {}  # member -> [due (loop.time()), polling, future resolved on leaving]
+        self._rotation = []
+        self._next = 0
+        self._in_flight = 0
+        self._wakeup = _Wakeup(loop)
+        self._task = None
+        self.polls = 0
+        self.budget_misses = 0
+        self.max_lateness = 0.0
+
+    def add(self, member):
+        """Start polling ``member``; returns a future resolved when it leaves."""
+        done = self._loop.create_future()
+        self._members[member] = [self._loop.time(), False, done]
+        self._rotation.append(member)
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._run())
+        self._wakeup.set()
+        return done
+
+    def wake(self, member):
+        """Make ``member`` due now."""
+        state = self._members.get(member)
+        if state is not None:
+            state[0] = self._loop.time()
+            self._wakeup.set()
+
+    def _remove(self, member):
+        state = self._members.pop(member)
+        index = self._rotation.index(member)
+        del self._rotation[index]
+        if index < self._next:
+            self._next -= 1
+        if not state[2].done():
+            state[2].set_result(None)
+
+    def _due(self, now):
+        """Idle members that are due, in rotation order, over-budget first."""
+        count = len(self._rotation)
+        due = []
+        for offset in range(count):
+            member = self._rotation[(self._next + offset) % count]
+            when, polling, _done = self._members[member]
+            if not polling and when <= now:
+                due.append(member)
+        due.sort(key=lambda member: now - self._members[member][0] <= member.budget)
+        return due
+
+    async def _run(self):
+        loop = self._loop
+        while self._members:
+            now = loop.time()
+            for member in self._due(now)[:self.max_in_flight - self._in_flight]:
+                state = self._members[member]
+                lateness = now - state[0]
+                self.max_lateness = max(self.max_lateness, lateness)
+                if lateness > member.budget:
+                    self.budget_misses += 1
+                state[1] = True
+                self._in_flight += 1
+                self._next = (self._rotation.index(member) + 1) % len(self._rotation)
+                loop.create_task(self._poll(member, now))
+            idle = [state[0] for state in self._members.values() if not state[1]]
+            timeout = None
+            if idle and self._in_flight < self.max_in_flight:
+                timeout = max(min(idle) - loop.time(), 0)
+            await self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    async def _poll(self, member, started):
+        try:
+            delay = await member.poll()
+        except Exception:
+            _logger.exception('PollHub: poll of %r failed', member)
+            delay = 1.0
+        self.polls += 1
+        self._in_flight -= 1
+        if delay is None:
+            self._remove(member)
+        else:
+            state = self._members[member]
+            if state[0] <= started:  # not woken while polling
+                state[0] = self._loop.time() + delay
+            state[1] = False
+        self._wakeup.set()
+
+    def stats(self):
+        return {
+            'members': len(self._members),
+            'polls': self.polls,
+            'budget_misses': self.budget_misses,
+            'max_lateness_ms': round(self.max_lateness * 1e3, 1),
+        }
+
+
+class ConnectionManager:
+    """Keep one long-lived serial connection per device.
+
+    ``get()`` hands out the open connection and only opens a new one when
+    there is none or the last one was invalidated.  Failed opens are retried
+    with exponential backoff (``backoff`` doubling up to ``max_backoff``
+    seconds); callers that hit an I/O error ``invalidate()`` the connection
+    so the next ``get()`` reopens it.
+
+    ``opener`` returns a newly opened connection; ``setup``, if given, is
+    called on it before it is handed out (e.g. to fix the line state).
+    """
+
+    def __init__(self, opener, setup=None, backoff=0.5, max_backoff=30.0):
+        self._opener = opener
+        self._setup = setup
+        self._initial_backoff = backoff
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self.connection = None
+        self.opens = 0
+        self.reopens = 0
+        self.failures = 0
+        self.last_open_duration = 0.0
+        self.total_open_duration = 0.0
+        self.last_error = None
+
+    def get(self):
+        """Return the open connection, opening it first if needed.
+
+        Raises serial.SerialException if the port cannot be opened, or if a
+        previous attempt failed and the backoff period has not elapsed yet.
+        """
+        connection = self.connection
+        if connection is not None and connection.is_open:
+            return connection
+        with self._lock:
+            connection = self.connection
+            if connection is not None and connection.is_open:
+                return connection
+            now = time.monotonic()
+            if now < self._retry_at:
+                raise serial.SerialException('port unavailable, next attempt in {:.1f}s: {}'.format(
+                    self._retry_at - now, self.last_error))
+            try:
+                connection = self._opener()
+                if self._setup:
+                    self._setup(connection)
+            except Exception as e:
+                if connection is not None:
+                    connection.close()
+                self.failures += 1
+                self.last_error = e
+                self._retry_at = now + self._backoff
+                self._backoff = min(self._backoff * 2, self._max_backoff)
+                raise serial.SerialException(str(e)) from e
+            self.last_open_duration = time.monotonic() - now
+            self.total_open_duration += self.last_open_duration
+            if self.opens:
+                self.reopens += 1
+            self.opens += 1
+            self._backoff = self._initial_backoff
+            self._retry_at = 0.0
+            self.last_error = None
+            self.connection = connection
+            return connection
+
+    def retry_in(self):
+        """Seconds until the next open attempt is allowed (0 if now)."""
+        return max(self._retry_at - time.monotonic(), 0.0)
+
+    def invalidate(self, connection=None):
+        """Drop ``connection`` (default: the current one) after an I/O
+        failure, so the next ``get()`` reopens the port."""
+        with self._lock:
+            if connection is None or connection is self.connection:
+                connection, self.connection = self.connection, None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def close(self):
+        self.invalidate()
+
+    def stats(self):
+        return {
+            'opens': self.opens,
+            'reopens': self.reopens,
+            'open_failures': self.failures,
+            'last_open_ms': round(self.last_open_duration * 1e3, 1),
+            'total_open_ms': round(self.total_open_duration * 1e3, 1),
+            'connected': self.connection is not None and self.connection.is_open,
+        }
+
+
+class ChangeFilter:
+    """Decide which weight readings are worth an event to POS.
+
+    - A change of at least ``deadband`` from the last published value goes
+      out straight away (subject to ``max_rate``).
+    - Smaller changes are treated as jitter and held back, unless the scale
+      keeps reporting the same new value for ``stability_window`` seconds,
+      in which case it is published once (0 disables this).
+    - No more than ``max_rate`` events per second are published (0 means
+      unlimited); a change that arrives too soon is re-offered with the
+      next reading, so only the newest value goes out.
+
+    ``emitted``, ``suppressed`` and ``rate_limited`` count the outcomes.
+    """
+
+    __slots__ = ('deadband', 'stability_window', 'min_interval', 'last_value', '_last_emit',
+                 '_candidate', '_candidate_since', 'emitted', 'suppressed', 'rate_limited')
+
+    def __init__(self, deadband=0.0, stability_window=0.0, max_rate=0.0):
+        self.deadband = deadband
+        self.stability_window = stability_window
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.last_value = None
+        self._last_emit = float('-inf')
+        self._candidate = None
+        self._candidate_since = 0.0
+        self.emitted = 0
+        self.suppressed = 0
+        self.rate_limited = 0
+
+    def offer(self, value, now=None, force=False, min_interval=None):
+        """Return True if ``value`` should be published now.
+
+        ``force`` publishes regardless of value and rate (e.g. error status);
+        ``min_interval`` (seconds) replaces the ``max_rate`` cap for this offer.
+        """
+        if now is None:
+            now = time.monotonic()
+        if not force:
+            if value == self.last_value:
+                self._candidate = None
+                return False
+            if not self._significant(value, now):
+                self.suppressed += 1
+                return False
+            if now - self._last_emit < (self.min_interval if min_interval is None else min_interval):
+                self.rate_limited += 1
+                return False
+        self.last_value = value
+        self._last_emit = now
+        self._candidate = None
+        self.emitted += 1
+        return True
+
+    def _significant(self, value, now):
+        last = self.last_value
+        if not (isinstance(value, float) and isinstance(last, float)) or abs(value - last) >= self.deadband:
+            return True
+        if value != self._candidate:
+            self._candidate = value
+            self._candidate_since = now
+            return False
+        return bool(self.stability_window) and now - self._candidate_since >= self.stability_window
+
+    def stats(self):
+        return {'emitted': self.emitted, 'suppressed': self.suppressed, 'rate_limited': self.rate_limited}
+
+
+class PollScheduler:
+    """Adaptive delay between weight polls.
+
+    - While the weight is changing, or while ``active`` is passed (a POS
+      session is using the scale), poll every ``fast`` seconds.  A weight
+      less than ``deadband`` away from the last change is idle jitter, not
+      a change.
+    - Once the weight holds still, drop back to ``normal``.
+    - While it holds still at zero (within ``zero_band``), multiply the
+      delay by ``backoff`` on every poll, up to ``idle``.
+    """
+
+    __slots__ = ('normal', 'fast', 'idle', 'backoff', 'zero_band', 'deadband', 'delay', '_last')
+
+    def __init__(self, normal, fast=0.1, idle=2.0, backoff=2.0, zero_band=0.0, deadband=0.0):
+        self.normal = normal
+        self.fast = fast
+        self.idle = max(idle, normal)
+        self.backoff = backoff
+        self.zero_band = zero_band
+        self.deadband = deadband
+        self.delay = normal
+        self._last = None
+
+    def next_delay(self, weight, active=False):
+        """Return the delay before the poll after the one that read ``weight``."""
+        last = self._last
+        if self.deadband and isinstance(weight, (int, float)) and isinstance(last, (int, float)):
+            changed = abs(weight - last) >= self.deadband
+        else:
+            changed = weight != last
+        if changed:
+            # Compared with the last change, not the last poll, so a slow
+            # drift still counts once it adds up to the deadband
+            self._last = weight
+        if changed or active:
+            self.delay = self.fast
+        elif isinstance(weight, (int, float)) and abs(weight) <= self.zero_band:
+            self.delay = self.normal if self.delay < self.normal else min(self.delay * self.backoff, self.idle)
+        else:
+            self.delay = self.normal
+        return self.delay
+
+
+class ReadingLeases:
+    """POS sessions that asked for live readings (start_reading).
+
+    Each session holds a lease until ``stop()``.  With a ``ttl`` the lease
+    also runs out ``ttl`` seconds after it was last renewed, so a POS tab
+    closed without a stop_reading cannot keep the scale polling at full
+    rate.  ``renew()`` only extends a lease the session already holds;
+    ``extend_all()`` extends every live one (e.g. while the weight is
+    changing, which shows the scale is in use).  ``lapsed_at`` is when a
+    lease last ran out (as opposed to being stopped), or -inf.
+    Leases are changed from action threads and checked from the I/O
+    thread, hence the lock; neither happens more than a few times a second.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl or float('inf')
+        self.lapsed_at = float('-inf')
+        self._expiry = {}
+        self._lock = threading.Lock()
+
+    def start(self, session, now=None):
+        with self._lock:
+            self._expiry[session] = (time.monotonic() if now is None else now) + self.ttl
+
+    def stop(self, session):
+        with self._lock:
+            self._expiry.pop(session, None)
+
+    def renew(self, session, now=None):
+        expiry = (time.monotonic() if now is None else now) + self.ttl
+        with self._lock:
+            # Checked under the lock: a stop() between the check and the
+            # update would otherwise bring the lease back
+            if session in self._expiry:
+                self._expiry[session] = expiry
+
+    def extend_all(self, now=None):
+        if self.ttl == float('inf'):
+            return
+        expiry = (time.monotonic() if now is None else now) + self.ttl
+        with self._lock:
+            for session, until in self._expiry.items():
+                if until > expiry - self.ttl:
+                    self._expiry[session] = expiry
+
+    def holders(self):
+        """The sessions holding a lease (as of the last ``active()``)."""
+        with self._lock:
+            return tuple(self._expiry)
+
+    def active(self, now=None):
+        """Return the number of live leases, dropping the expired ones."""
+        if not self._expiry:
+            return 0
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            expired = [session for session, until in self._expiry.items() if until <= now]
+            for session in expired:
+                del self._expiry[session]
+            if expired:
+                self.lapsed_at = now
+            return len(self._expiry)
+
+
+class Histogram:
+    """Fixed-bucket histogram: ``observe()`` is one bisect and two adds.
+
+    ``edges`` are the bucket upper bounds; values above the last one are
+    only counted in ``count`` and ``sum`` (the Prometheus +Inf bucket).
+    """
+
+    __slots__ = ('edges', 'counts', 'count', 'sum')
+
+    def __init__(self, edges):
+        self.edges = tuple(edges)
+        self.counts = [0] * len(self.edges)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.edges, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Yield (upper bound, observations <= it), Prometheus style."""
+        total = 0
+        for edge, count in zip(self.edges, self.counts):
+            total += count
+            yield edge, total
+
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+FRAME_OK = 'ok'
+FRAME_NO_MATCH = 'no_match'
+FRAME_TIMEOUT = 'timeout'
+
+
+class FrameRing:
+    """The last ``size`` raw frames with when they arrived and what came of them.
+
+    The slots are preallocated and ``record()`` only stores references to
+    objects the caller already holds (the frame, its monotonic time, an
+    outcome constant, the parsed weight), so steady-state recording
+    allocates nothing.  One writer (the I/O path); ``dump()`` may run on any
+    thread and, like the counters, can at worst see the slot being written.
+    """
+
+    __slots__ = ('size', 'recorded', '_times', '_frames', '_outcomes', '_weights')
+
+    def __init__(self, size):
+        self.size = size
+        self.recorded = 0
+        self._times = [0.0] * size
+        self._frames = [b''] * size
+        self._outcomes = [None] * size
+        self._weights = [None] * size
+
+    def record(self, when, frame, outcome, weight=None):
+        index = self.recorded % self.size
+        self._times[index] = when
+        self._frames[index] = frame
+        self._outcomes[index] = outcome
+        self._weights[index] = weight
+        self.recorded += 1
+
+    def dump(self, now=None):
+        """Return the recorded frames, oldest first, as JSON-ready dicts;
+        ``age`` is in seconds before ``now`` (default: time.monotonic())."""
+        if now is None:
+            now = time.monotonic()
+        recorded = self.recorded
+        first = max(recorded - self.size, 0)
+        entries = []
+        for sequence in range(first, recorded):
+            index = sequence % self.size
+            entries.append({
+                'sequence': sequence,
+                'age': round(now - self._times[index], 6),
+                'frame': self._frames[index].decode('ascii', 'backslashreplace'),
+                'outcome': self._outcomes[index],
+                'weight': self._weights[index],
+            })
+        return entries
+
+
+class DeviceMetrics:
+    """Counters and histograms for one scale, updated on the I/O path with
+    plain attribute arithmetic (no locks: each field has one writer, and a
+    scrape that reads a counter mid-update is off by one at worst)."""
+
+    COUNTERS = (
+        ('polls', 'Weight requests sent to the scale'),
+        ('frames', 'Frames parsed into a weight'),
+        ('parse_failures', 'Frames that held no weight'),
+        ('bytes_read', 'Bytes received in frames'),
+        ('timeouts', 'Polls that got no complete frame in time'),
+        ('bytes_skipped', 'Stale, superseded or garbled bytes dropped to stay on frame boundaries'),
+        ('connection_errors', 'Serial errors that dropped the connection'),
+        ('reconnects', 'Connections reopened after an error'),
+        ('events', 'Measurement events sent to POS'),
+        ('events_filtered', 'Measurement events held back by the change filter'),
+        ('events_superseded', 'Measurement events replaced by a newer one while waiting for a slow dispatch'),
+        ('actions', 'Actions received from POS'),
+        ('reads_cached', 'read_once actions answered from the newest reading'),
+        ('reads_shared', 'read_once actions answered by a measurement already pending'),
+        ('io_seconds', 'Time spent polling and reading'),
+        ('wait_seconds', 'Time spent waiting between polls'),
+    )
+    HISTOGRAMS = (
+        ('poll_seconds', 'Time from sending a weight request to holding its frame'),
+        ('action_seconds', 'Time from receiving an action to answering it'),
+    )
+
+    __slots__ = tuple(name for name, _help in COUNTERS + HISTOGRAMS) + (
+        'connected', 'recent_frames', '_io_started', '_io_ended')
+
+    def __init__(self, buckets=LATENCY_BUCKETS, frame_log=64):
+        for name, _help in self.COUNTERS:
+            setattr(self, name, 0)
+        for name, _help in self.HISTOGRAMS:
+            setattr(self, name, Histogram(buckets))
+        self.connected = 0
+        self.recent_frames = FrameRing(frame_log)
+        self._io_started = None
+        self._io_ended = None
+
+    def begin_io(self, now):
+        """Mark the start of a poll; the time since the last one ended is waiting."""
+        if self._io_ended is not None:
+            self.wait_seconds += now - self._io_ended
+        self._io_started = now
+
+    def end_io(self, now):
+        if self._io_started is not None:
+            self.io_seconds += now - self._io_started
+        self._io_ended = now
+
+
+class MetricsRegistry:
+    """DeviceMetrics per device identifier, rendered as Prometheus text.
+
+    A driver re-created for the same device keeps adding to the same
+    counters, so they only ever go up, as Prometheus expects, and to the
+    same ring of the last ``frame_log`` raw frames.
+    """
+
+    def __init__(self, prefix='cpwplus', frame_log=64):
+        self.prefix = prefix
+        self.frame_log = frame_log
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    def device(self, identifier):
+        with self._lock:
+            metrics = self._devices.get(identifier)
+            if metrics is None:
+                metrics = self._devices[identifier] = DeviceMetrics(frame_log=self.frame_log)
+            return metrics
+
+    def recent_frames(self):
+        """Return {device identifier: FrameRing.dump()} for every device."""
+        with self._lock:
+            devices = sorted(self._devices.items())
+        now = time.monotonic()
+        return {identifier: metrics.recent_frames.dump(now) for identifier, metrics in devices}
+
+    def render(self):
+        """Return every device's metrics in the Prometheus text format."""
+        with self._lock:
+            devices = sorted(self._devices.items())
+        lines = []
+        prefix = self.prefix
+        labels = {identifier: 'device="{}"'.format(identifier.replace('\\', '\\\\').replace('"', '\\"'))
+                  for identifier, _metrics in devices}
+        for name, help_text in DeviceMetrics.COUNTERS:
+            metric = '{}_{}_total'.format(prefix, name)
+            lines += ['# HELP {} {}'.format(metric, help_text), '# TYPE {} counter'.format(metric)]
+            lines += ['{}{{{}}} {}'.format(metric, labels[identifier], getattr(metrics, name))
+                      for identifier, metrics in devices]
+        metric = '{}_connected'.format(prefix)
+        lines += ['# HELP {} 1 while the scale is connected'.format(metric), '# TYPE {} gauge'.format(metric)]
+        lines += ['{}{{{}}} {}'.format(metric, labels[identifier], metrics.connected)
+                  for identifier, metrics in devices]
+        for name, help_text in DeviceMetrics.HISTOGRAMS:
+            metric = '{}_{}'.format(prefix, name)
+            lines += ['# HELP {} {}'.format(metric, help_text), '# TYPE {} histogram'.format(metric)]
+            for identifier, metrics in devices:
+                histogram = getattr(metrics, name)
+                label = labels[identifier]
+                lines += ['{}_bucket{{{},le="{:g}"}} {}'.format(metric, label, edge, count)
+                          for edge, count in histogram.cumulative()]
+                lines += [
+                    '{}_bucket{{{},le="+Inf"}} {}'.format(metric, label, histogram.count),
+                    '{}_sum{{{}}} {}'.format(metric, label, histogram.sum),
+                    '{}_count{{{}}} {}'.format(metric, label, histogram.count),
+                ]
+        return '\n'.join(lines) + '\n'
+
+
+class LogSummary:
+    """Log a recurring problem once, then summarise it instead of repeating it.
+
+    The first call logs ``message % args`` straight away.  Further calls
+    within ``interval`` seconds only count and keep up to ``samples``
+    argument tuples; the next call after the interval logs one line with
+    the count and the samples (the last argument of each, e.g. the raw
+    frame).  ``resolved()`` logs what is still pending
+    (and ``resolved_message``) and re-arms the immediate first message.
+    Formatting is left to the logging module, so suppressed calls never
+    build a string.
+    """
+
+    __slots__ = ('logger', 'level', 'message', 'resolved_message', 'interval', 'max_samples', 'count', 'samples',
+                 '_since', '_next')
+
+    def __init__(self, logger, level, message, interval=60.0, samples=3, resolved_message=None):
+        self.logger = logger
+        self.level = level
+        self.message = message
+        self.resolved_message = resolved_message
+        self.interval = interval
+        self.max_samples = samples
+        self.count = 0
+        self.samples = []
+        self._since = 0.0
+        self._next = 0.0
+
+    def __call__(self, *args):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        self.count += 1
+        if len(self.samples) < self.max_samples:
+            self.samples.append(args)
+        now = time.monotonic()
+        if now >= self._next:
+            self._flush(now)
+
+    def _flush(self, now):
+        if self.count == 1 and not self._next:
+            self.logger.log(self.level, self.message, *self.samples[0])
+        elif self.count:
+            self.logger.log(self.level, self.message + ' (%d in the last %.0fs, samples: %r)',
+                            *self.samples[0], self.count, now - self._since, [args[-1] for args in self.samples[1:]])
+        self.count = 0
+        self.samples = []
+        self._since = now
+        self._next = now + self.interval
+
+    def resolved(self):
+        """The problem is gone: log any pending count and ``resolved_message``,
+        and log the next occurrence straight away again."""
+        if not self._next:
+            return
+        if self.count:
+            self._flush(time.monotonic())
+        if self.resolved_message:
+            self.logger.log(self.level, self.resolved_message)
+        self._next = 0.0
+
+
+def usb_serial_ports():
+    """Device paths of the USB serial adapters currently plugged in."""
+    from serial.tools import list_ports
+    return [port.device for port in list_ports.comports() if port.vid is not None]
+
+
+def ports_open_in_process():
+    """Real paths of the /dev nodes this process has open (empty off Linux).
+
+    Ports another driver in the IoT service is already using show up here,
+    so speculative probing can leave them alone.
+    """
+    paths = set()
+    try:
+        fds = os.listdir('/proc/self/fd')
+    except OSError:
+        return paths
+    for fd in fds:
+        try:
+            target = os.readlink('/proc/self/fd/' + fd)
+        except OSError:
+            continue
+        if target.startswith('/dev/'):
+            paths.add(target)
+    return paths
+
+
+class ParallelProber:
+    """Probe candidate ports concurrently and hand out the results per port.
+
+    The IoT framework asks ``supported()`` about one port at a time.  The
+    first question starts ``probe(path)`` for that port and, speculatively,
+    for every other port from ``candidates()`` that is not ``in_use()``;
+    later questions about those ports then only wait for a probe that is
+    already running or done.  A scan therefore takes about as long as the
+    slowest port rather than the sum of all of them.  Speculative results
+    nobody asks for within ``ttl`` seconds are dropped.
+
+    Speculative probes run ``speculate(path)`` (default ``probe``), which
+    may return None for a port it found busy; that port is then probed
+    with ``probe`` once it is asked about.  Candidates for which
+    ``known(path)`` is true (e.g. already in a ProbeCache) are not probed
+    speculatively.
+    """
+
+    def __init__(self, probe, candidates=usb_serial_ports, in_use=ports_open_in_process,
+                 max_workers=8, ttl=10.0, speculate=None, known=None):
+        self._probe = probe
+        self._speculative_probe = speculate or probe
+        self._known = known
+        self._candidates = candidates
+        self._in_use = in_use
+        self._ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cpwplus-probe')
+        self._lock = threading.Lock()
+        self._pending = {}  # real path -> (future, time.monotonic() when submitted)
+
+    def result(self, path):
+        """Return ``probe(path)``, reusing a speculative probe if one exists."""
+        key = os.path.realpath(path)
+        with self._lock:
+            self._expire()
+            entry = self._pending.pop(key, None)
+            if entry is None:
+                future = self._executor.submit(self._probe, path)
+                self._speculate(key)
+            else:
+                future = entry[0]
+        result = future.result()
+        if result is None:
+            result = self._probe(path)
+        return result
+
+    def _speculate(self, requested):
+        try:
+            candidates = self._candidates()
+            in_use = self._in_use()
+        except Exception:
+            _logger.exception('CPWplus: could not list ports for parallel probing')
+            return
+        now = time.monotonic()
+        for candidate in candidates:
+            key = os.path.realpath(candidate)
+            if key == requested or key in self._pending or key in in_use:
+                continue
+            if self._known is not None and self._known(candidate):
+                continue
+            self._pending[key] = (self._executor.submit(self._speculative_probe, candidate), now)
+
+    def _expire(self):
+        now = time.monotonic()
+        for key, (future, submitted) in list(self._pending.items()):
+            if future.done() and now - submitted > self._ttl:
+                del self._pending[key]
+
+
+class ProbeCache:
+    """Persistent record of which USB serial adapters are (or are not) a
+    CPWplus, so rescans can skip probing devices we already know.
+
+    Entries are keyed by stable USB identity -- ``VID:PID:serial`` when the
+    adapter reports a serial number, otherwise its /dev/serial/by-id path --
+    never by ttyUSBn, which can change between plug-ins.  Ports without a
+    stable identity are not cached.  Positive results are kept for ``ttl``
+    seconds and negative ones for ``negative_ttl``; an entry is also dropped
+    as soon as its adapter is no longer plugged in, or on ``invalidate()``.
+
+    The cache is saved as JSON to ``path``; if that fails (e.g. read-only
+    filesystem) it keeps working in memory.
+    """
+
+    def __init__(self, path, ttl=24 * 3600, negative_ttl=300):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> {'supported': bool, 'time': time.time(), 'port': identifier}
+        self._save_failed = False
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            _logger.warning('CPWplus: ignoring unreadable probe cache %s', path)
+            return
+        if not isinstance(entries, dict):
+            _logger.warning('CPWplus: ignoring malformed probe cache %s', path)
+            return
+        self._entries = {key: entry for key, entry in entries.items() if self._valid_entry(entry)}
+        if len(self._entries) != len(entries):
+            _logger.warning('CPWplus: dropped %d malformed entries from probe cache %s',
+                            len(entries) - len(self._entries), path)
+
+    @staticmethod
+    def _valid_entry(entry):
+        return (isinstance(entry, dict) and isinstance(entry.get('supported'), bool)
+                and isinstance(entry.get('time'), (int, float)) and not isinstance(entry['time'], bool))
+
+    @staticmethod
+    def _present_ports():
+        """Map the real path of each plugged-in USB serial port to its key."""
+        from serial.tools import list_ports
+        keys = {}
+        for link in glob.glob('/dev/serial/by-id/*'):
+            keys[os.path.realpath(link)] = link
+        for port in list_ports.comports():
+            if port.vid is not None and port.serial_number:
+                keys[os.path.realpath(port.device)] = '{:04X}:{:04X}:{}'.format(
+                    port.vid, port.pid, port.serial_number)
+        return keys
+
+    def get(self, identifier):
+        """Return the cached True/False for ``identifier``, or None."""
+        present = self._present_ports()
+        key = present.get(os.path.realpath(identifier))
+        now = time.time()
+        with self._lock:
+            known = set(present.values())
+            stale = [k for k, entry in self._entries.items()
+                     if k not in known or now - entry['time'] > (self.ttl if entry['supported'] else self.negative_ttl)]
+            for k in stale:
+                del self._entries[k]
+            entry = self._entries.get(key) if key else None
+            if stale:
+                self._save()
+        return None if entry is None else entry['supported']
+
+    def put(self, identifier, supported):
+        key = self._present_ports().get(os.path.realpath(identifier))
+        if not key:
+            return
+        with self._lock:
+            self._entries[key] = {'supported': supported, 'time': time.time(), 'port': identifier}
+            self._save()
+
+    def invalidate(self, identifier):
+        key = self._present_ports().get(os.path.realpath(identifier))
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            if not self._save_failed:
+                self._save_failed = True
+                _logger.warning('CPWplus: cannot write probe cache %s, keeping it in memory only', self.path)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Pseudo-terminal stand-in for an Adam CPWplus scale.
+
+Creates a PTY whose slave end behaves like the scale's RS-232 port: it
+answers G/N commands (trn 1 demand mode) with a weight frame and acts on
+T (tare) and Z (zero), or transmits frames continuously (trn 2 stream
+mode), paced at the configured baud rate.  Latency, jitter, units, the
+ST/US/OL status prefix and line noise are all configurable, and any
+number of instances can run side by side.  Used by the bench_*.py scripts
+so the driver's serial path can be exercised on any Linux machine without
+a scale.
+
+Usage:
+    python3 cpwplus_simulator.py [options]   # prints the port(s), runs until Ctrl+C
+    python3 cpwplus_simulator.py --help
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+BAUD_RATE = 9600
+NOISE = bytes(range(256))
+
+
+class FakeScale:
+    """A CPWplus behind a pseudo-terminal.
+
+    ``port`` is the slave device path to open with pyserial.  ``latency`` is
+    the delay between receiving a command and starting the reply, plus a
+    uniformly random extra of up to ``jitter`` seconds; each reply byte
+    then takes ``10 / baudrate`` seconds like on a real 8N1 line.
+
+    With ``stream`` set to an interval in seconds the scale behaves as in
+    trn 2 and sends a frame every interval without being asked.
+
+    ``weight`` is the load on the platform and may be changed at any time;
+    it is reported less the zero offset set by Z and, once tared with T,
+    as a net (N/W) weight.  Negative weights get a ``-`` sign.
+
+    With ``status`` set, frames start with the stability prefix some
+    firmware sends: ``US,`` for ``settle`` seconds after the weight last
+    changed, ``ST,`` after that, ``OL,`` above ``capacity``.
+
+    ``garbage`` is the probability (0..1) that a frame is preceded by a
+    burst of random bytes, as a noisy line or an adapter glitch produces.
+    """
+
+    def __init__(self, weight=0.58, unit='lb', latency=0.02, jitter=0.0, baudrate=BAUD_RATE,
+                 stream=None, status=False, settle=0.0, capacity=None, garbage=0.0, seed=None):
+        self._weight = weight
+        self._changed = 0.0
+        self.unit = unit
+        self.latency = latency
+        self.jitter = jitter
+        self.stream = stream
+        self.status = status
+        self.settle = settle
+        self.capacity = capacity
+        self.garbage = garbage
+        self.byte_time = 10.0 / baudrate if baudrate else 0.0
+        self.zero_offset = 0.0
+        self.tare_weight = 0.0
+        self.commands = 0
+        self.port = None
+        self._random = random.Random(seed)
+        self._master = self._slave = None
+        self._wakeup = None
+        self._thread = None
+
+    @property
+    def weight(self):
+        return self._weight
+
+    @weight.setter
+    def weight(self, value):
+        if value != self._weight:
+            self._changed = time.monotonic()
+        self._weight = value
+
+    @property
+    def stable(self):
+        return time.monotonic() - self._changed >= self.settle
+
+    def tare(self):
+        self.tare_weight = self._weight - self.zero_offset
+
+    def zero(self):
+        self.zero_offset = self._weight
+        self.tare_weight = 0.0
+
+    def frame(self, command=b'G'):
+        gross = self._weight - self.zero_offset
+        net = gross - self.tare_weight
+        if command == b'N' or self.tare_weight:
+            prefix, value = 'N/W', net
+        else:
+            prefix, value = 'G/W', gross
+        if self.status:
+            if self.capacity is not None and abs(gross) > self.capacity:
+                prefix = 'OL,' + prefix
+            else:
+                prefix = ('ST,' if self.stable else 'US,') + prefix
+        sign = '-' if value < 0 else '+'
+        return '{}  {} {:7.2f} {}\r\n'.format(prefix, sign, abs(value), self.unit).encode('ascii')
+
+    def noise(self):
+        """Random junk to put in front of a frame (empty most of the time)."""
+        if not self.garbage or self._random.random() >= self.garbage:
+            return b''
+        return bytes(self._random.choice(NOISE) for _ in range(self._random.randint(1, 8)))
+
+    def start(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._wakeup = os.pipe()
+        self._thread = threading.Thread(target=self._serve, name='FakeScale %s' % self.port, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread:
+            os.write(self._wakeup[1], b'x')
+            self._thread.join()
+            self._thread = None
+        for fd in (self._master, self._slave) + tuple(self._wakeup or ()):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = self._wakeup = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _send(self, payload):
+        if not self.byte_time:
+            os.write(self._master, payload)
+            return
+        start = time.monotonic()
+        for index in range(len(payload)):
+            delay = start + (index + 1) * self.byte_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            os.write(self._master, payload[index:index + 1])
+
+    def _serve(self):
+        pending = b''
+        next_frame = time.monotonic()
+        while True:
+            timeout = None
+            interval = self.stream
+            if interval:
+                timeout = next_frame - time.monotonic()
+                if timeout <= 0:
+                    self._send(self.noise() + self.frame())
+                    next_frame = max(next_frame + interval, time.monotonic())
+                    continue
+            ready = select.select([self._master, self._wakeup[0]], [], [], timeout)[0]
+            if self._wakeup[0] in ready:
+                return
+            if not ready:
+                continue
+            pending += os.read(self._master, 256)
+            while b'\n' in pending:
+                line, pending = pending.split(b'\n', 1)
+                command = line.strip()
+                if command in (b'G', b'N'):
+                    self.commands += 1
+                    time.sleep(self.latency + self._random.uniform(0, self.jitter))
+                    self._send(self.noise() + self.frame(command))
+                elif command == b'T':
+                    self.commands += 1
+                    self.tare()
+                elif command == b'Z':
+                    self.commands += 1
+                    self.zero()
+
+
+@contextlib.contextmanager
+def fake_scales(count, **options):
+    """Run ``count`` FakeScale instances with the same ``options``; yields
+    the list of started scales and stops them all on exit."""
+    with contextlib.ExitStack() as stack:
+        yield [stack.enter_context(FakeScale(**options)) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Adam CPWplus scale(s) on pseudo-terminals.')
+    parser.add_argument('--count', type=int, default=1, help='number of scales (default 1)')
+    parser.add_argument('--weight', type=float, default=0.58)
+    parser.add_argument('--unit', choices=('lb', 'kg', 'oz'), default='lb')
+    parser.add_argument('--latency', type=float, default=20, help='reply latency in ms (default 20)')
+    parser.add_argument('--jitter', type=float, default=0, help='extra random latency in ms')
+    parser.add_argument('--stream', type=float, metavar='MS', help='trn 2: send a frame every MS ms')
+    parser.add_argument('--status', action='store_true', help='prefix frames with ST/US/OL')
+    parser.add_argument('--settle', type=float, default=0, help='seconds reported US after a change')
+    parser.add_argument('--capacity', type=float, help='report OL above this weight')
+    parser.add_argument('--garbage', type=float, default=0, help='probability of noise before a frame')
+    args = parser.parse_args()
+    options = dict(
+        weight=args.weight, unit=args.unit, latency=args.latency / 1e3, jitter=args.jitter / 1e3,
+        stream=args.stream / 1e3 if args.stream else None, status=args.status, settle=args.settle,
+        capacity=args.capacity, garbage=args.garbage,
+    )
+    with fake_scales(args.count, **options) as scales:
+        for scale in scales:
+            print('Fake CPWplus listening on {}'.format(scale.port))
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,5 @@
 #!/usr/bin/env bash
-# deploy.sh — Deploy AdamCPWplusDriver.py to an Odoo IoT Box via SSH
+# deploy.sh — Deploy AdamCPWplusDriver.py (and cpwplus_protocol.py) to an Odoo IoT Box via SSH
 #
 # Usage:
 #   ./deploy.sh <iot_box_ip> [ssh_user] [ssh_password]
@@ -22,7 +22,8 @@ set -euo pipefail
 
 DRIVER_FILE="AdamCPWplusDriver.py"
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
-DRIVER_PATH="${SCRIPT_DIR}/${DRIVER_FILE}"
+# Modules the driver imports; deployed next to it in the drivers directory
+DRIVER_FILES=("$DRIVER_FILE" "cpwplus_protocol.py")
 
 # IoT Box paths
 PERSISTENT_DIR="/root_bypass_ramdisks/home/pi/odoo/addons/iot_drivers/iot_handlers/drivers"
@@ -40,10 +41,12 @@ if [[ -z "$IOT_IP" ]]; then
     exit 1
 fi
 
-if [[ ! -f "$DRIVER_PATH" ]]; then
-    echo "ERROR: Driver file not found at: $DRIVER_PATH"
-    exit 1
-fi
+for file in "${DRIVER_FILES[@]}"; do
+    if [[ ! -f "${SCRIPT_DIR}/${file}" ]]; then
+        echo "ERROR: Driver file not found at: ${SCRIPT_DIR}/${file}"
+        exit 1
+    fi
+done
 
 echo "=== Deploying ${DRIVER_FILE} to IoT Box at ${IOT_IP} ==="
 echo ""
@@ -73,14 +76,18 @@ eval "${SSH_CMD}" "sudo mount -o remount,rw / 2>/dev/null; sudo mount -o remount
 
 # Step 2: Copy to persistent location (survives reboots)
 echo "[2/4] Copying driver to persistent location..."
-eval "${SCP_CMD}" "${DRIVER_PATH}" "${SSH_USER}@${IOT_IP}:/tmp/${DRIVER_FILE}"
-eval "${SSH_CMD}" "sudo mkdir -p ${PERSISTENT_DIR} && sudo cp /tmp/${DRIVER_FILE} ${PERSISTENT_DIR}/${DRIVER_FILE}"
-echo "  -> ${PERSISTENT_DIR}/${DRIVER_FILE}"
+for file in "${DRIVER_FILES[@]}"; do
+    eval "${SCP_CMD}" "${SCRIPT_DIR}/${file}" "${SSH_USER}@${IOT_IP}:/tmp/${file}"
+    eval "${SSH_CMD}" "sudo mkdir -p ${PERSISTENT_DIR} && sudo cp /tmp/${file} ${PERSISTENT_DIR}/${file}"
+    echo "  -> ${PERSISTENT_DIR}/${file}"
+done
 
 # Step 3: Copy to active location (immediate use)
 echo "[3/4] Copying driver to active location..."
-eval "${SSH_CMD}" "sudo mkdir -p ${ACTIVE_DIR} && sudo cp /tmp/${DRIVER_FILE} ${ACTIVE_DIR}/${DRIVER_FILE}"
-echo "  -> ${ACTIVE_DIR}/${DRIVER_FILE}"
+for file in "${DRIVER_FILES[@]}"; do
+    eval "${SSH_CMD}" "sudo mkdir -p ${ACTIVE_DIR} && sudo cp /tmp/${file} ${ACTIVE_DIR}/${file}"
+    echo "  -> ${ACTIVE_DIR}/${file}"
+done
 
 # Step 4: Restart Odoo service
 echo "[4/4] Restarting Odoo service..."
@@ -6,9 +6,9 @@
 #   curl -fsSL https://raw.githubusercontent.com/thrivewell-partners/odoo-cpwplus-driver/main/install.sh | sudo bash
 #
 # What it does:
-#   1. Downloads AdamCPWplusDriver.py from GitHub
-#   2. Copies to the persistent location (survives reboots)
-#   3. Copies to the active location (works immediately)
+#   1. Downloads AdamCPWplusDriver.py and cpwplus_protocol.py from GitHub
+#   2. Copies them to the persistent location (survives reboots)
+#   3. Copies them to the active location (works immediately)
 #   4. Restarts the Odoo service
 #
 # To uninstall:
@@ -19,6 +19,8 @@ set -euo pipefail
 # --- Configuration ---
 REPO_BASE="https://raw.githubusercontent.com/thrivewell-partners/odoo-cpwplus-driver/main"
 DRIVER_FILE="AdamCPWplusDriver.py"
+# Modules the driver imports; deployed next to it in the drivers directory
+DRIVER_FILES=("$DRIVER_FILE" "cpwplus_protocol.py")
 PERSISTENT_DIR="/root_bypass_ramdisks/home/pi/odoo/addons/iot_drivers/iot_handlers/drivers"
 ACTIVE_DIR="/home/pi/odoo/addons/iot_drivers/iot_handlers/drivers"
 
@@ -39,12 +41,14 @@ if [[ "${1:-}" == "--uninstall" ]]; then
     echo ""
 
     for dir in "$PERSISTENT_DIR" "$ACTIVE_DIR"; do
-        if [[ -f "${dir}/${DRIVER_FILE}" ]]; then
-            rm -f "${dir}/${DRIVER_FILE}"
-            info "Removed ${dir}/${DRIVER_FILE}"
-        else
-            warn "Not found: ${dir}/${DRIVER_FILE} (already removed?)"
-        fi
+        for file in "${DRIVER_FILES[@]}"; do
+            if [[ -f "${dir}/${file}" ]]; then
+                rm -f "${dir}/${file}"
+                info "Removed ${dir}/${file}"
+            else
+                warn "Not found: ${dir}/${file} (already removed?)"
+            fi
+        done
     done
 
     info "Restarting Odoo service..."
@@ -81,43 +85,49 @@ info "Remounting filesystems as writable..."
 mount -o remount,rw / 2>/dev/null || true
 mount -o remount,rw /root_bypass_ramdisks 2>/dev/null || true
 
-# Step 2: Download the driver
-info "Downloading ${DRIVER_FILE} from GitHub..."
-TMPFILE=$(mktemp /tmp/cpwplus-XXXXXX.py)
-if ! curl -fsSL "${REPO_BASE}/${DRIVER_FILE}" -o "$TMPFILE"; then
-    error "Failed to download driver from GitHub"
-    echo "  URL: ${REPO_BASE}/${DRIVER_FILE}"
-    echo "  Check your internet connection and try again"
-    rm -f "$TMPFILE"
-    exit 1
-fi
-
-# Verify we got a Python file (not an HTML error page)
-if ! head -1 "$TMPFILE" | grep -q "coding: utf-8\|^#\|^import"; then
-    error "Downloaded file doesn't look like a Python driver"
-    echo "  This may mean the GitHub URL is wrong or the repo is not public"
-    rm -f "$TMPFILE"
-    exit 1
-fi
-
-info "Download complete ($(wc -c < "$TMPFILE") bytes)"
+# Step 2: Download the driver files
+TMPDIR=$(mktemp -d /tmp/cpwplus-XXXXXX)
+for file in "${DRIVER_FILES[@]}"; do
+    info "Downloading ${file} from GitHub..."
+    if ! curl -fsSL "${REPO_BASE}/${file}" -o "${TMPDIR}/${file}"; then
+        error "Failed to download driver from GitHub"
+        echo "  URL: ${REPO_BASE}/${file}"
+        echo "  Check your internet connection and try again"
+        rm -rf "$TMPDIR"
+        exit 1
+    fi
+
+    # Verify we got a Python file (not an HTML error page)
+    if ! head -1 "${TMPDIR}/${file}" | grep -q "coding: utf-8\|^#\|^import"; then
+        error "Downloaded ${file} doesn't look like a Python driver"
+        echo "  This may mean the GitHub URL is wrong or the repo is not public"
+        rm -rf "$TMPDIR"
+        exit 1
+    fi
+
+    info "Download complete ($(wc -c < "${TMPDIR}/${file}") bytes)"
+done
 
 # Step 3: Copy to persistent location
 info "Installing to persistent location..."
 mkdir -p "$PERSISTENT_DIR"
-cp "$TMPFILE" "${PERSISTENT_DIR}/${DRIVER_FILE}"
-chmod 644 "${PERSISTENT_DIR}/${DRIVER_FILE}"
-echo "  -> ${PERSISTENT_DIR}/${DRIVER_FILE}"
+for file in "${DRIVER_FILES[@]}"; do
+    cp "${TMPDIR}/${file}" "${PERSISTENT_DIR}/${file}"
+    chmod 644 "${PERSISTENT_DIR}/${file}"
+    echo "  -> ${PERSISTENT_DIR}/${file}"
+done
 
 # Step 4: Copy to active location
 info "Installing to active location..."
 mkdir -p "$ACTIVE_DIR"
-cp "$TMPFILE" "${ACTIVE_DIR}/${DRIVER_FILE}"
-chmod 644 "${ACTIVE_DIR}/${DRIVER_FILE}"
-echo "  -> ${ACTIVE_DIR}/${DRIVER_FILE}"
-
-# Cleanup temp file
-rm -f "$TMPFILE"
+for file in "${DRIVER_FILES[@]}"; do
+    cp "${TMPDIR}/${file}" "${ACTIVE_DIR}/${file}"
+    chmod 644 "${ACTIVE_DIR}/${file}"
+    echo "  -> ${ACTIVE_DIR}/${file}"
+done
+
+# Cleanup temp files
+rm -rf "$TMPDIR"
 
 # Step 5: Restart Odoo
 info "Restarting Odoo service..."
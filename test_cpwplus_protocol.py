@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Unit tests for cpwplus_protocol.
+
+Usage:
+    python3 -m unittest test_cpwplus_protocol
+"""
+
+import unittest
+
+from cpwplus_protocol import PollScheduler
+
+
+class PollSchedulerTest(unittest.TestCase):
+
+    def scheduler(self):
+        # The driver's settings: newMeasureDelay, CPW_POLL_*, CPW_EVENT_DEADBAND
+        return PollScheduler(0.2, fast=0.1, idle=2.0, backoff=2.0, zero_band=0.02, deadband=0.02)
+
+    def test_idle_jitter_backs_off(self):
+        scheduler = self.scheduler()
+        delays = [scheduler.next_delay(weight) for weight in [0.0, 0.01, 0.0, 0.01, 0.0, 0.01, 0.0]]
+        self.assertEqual(delays, [0.1, 0.2, 0.4, 0.8, 1.6, 2.0, 2.0])
+
+    def test_change_past_deadband_polls_fast(self):
+        scheduler = self.scheduler()
+        for weight in [0.0, 0.01, 0.0, 0.01]:
+            scheduler.next_delay(weight)
+        self.assertEqual(scheduler.next_delay(1.25), 0.1)
+        self.assertEqual(scheduler.next_delay(1.26), 0.2)
+
+    def test_slow_drift_adds_up(self):
+        scheduler = self.scheduler()
+        delays = [scheduler.next_delay(weight) for weight in [1.0, 1.01, 1.02]]
+        self.assertEqual(delays, [0.1, 0.2, 0.1])
+
+    def test_non_numeric_result(self):
+        scheduler = self.scheduler()
+        self.assertEqual(scheduler.next_delay(''), 0.1)
+        self.assertEqual(scheduler.next_delay(''), 0.2)
+
+    def test_active_session_polls_fast(self):
+        scheduler = self.scheduler()
+        scheduler.next_delay(0.0)
+        self.assertEqual(scheduler.next_delay(0.01, active=True), 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,14 +9,16 @@ Usage:
 
 Requirements:
     pip install pyserial
+    cpwplus_protocol.py (from this repository) next to this script
 """
 
-import re
 import sys
 import time
 
 import serial
 
+from cpwplus_protocol import looks_like_cpwplus, parse_frame
+
 # --- Configuration (must match CPWplus scale settings) ---
 BAUD_RATE = 9600
 BYTE_SIZE = serial.EIGHTBITS
@@ -24,11 +26,10 @@ STOP_BITS = serial.STOPBITS_ONE
 PARITY = serial.PARITY_NONE
 TIMEOUT = 2  # seconds
 
-# Regex matching CPWplus response format
-# The G/W or N/W prefix is optional — some firmware versions omit it,
-# sending just "+  0.58  lb\r\n" instead of "G/W  + 0.58 lb\r\n".
-WEIGHT_RE = rb"(?:[GN]/W\s*)?[+-]\s*([0-9.]+)\s+(?:lb|kg|oz)"
-SIGN_RE = rb"(?:[GN]/W\s*)?(-)\s*[0-9.]"
+# Responses are parsed with cpwplus_protocol.parse_frame(), the same parser
+# the driver uses.  The G/W or N/W prefix is optional — some firmware
+# versions omit it, sending just "+  0.58  lb\r\n" instead of
+# "G/W  + 0.58 lb\r\n".
 
 # Default serial port
 DEFAULT_PORT = '/dev/ttyUSB0'
@@ -49,6 +50,18 @@ def open_connection(port):
     return conn
 
 
+def report_reading(answer):
+    """Parse a weight response and print what the driver would see."""
+    reading = parse_frame(answer)
+    if reading is None:
+        print("  WARNING: No weight match found in response!")
+        return False
+    kind = {None: 'unmarked', False: 'gross', True: 'net'}[reading.net]
+    stable = {None: 'not reported', False: 'no', True: 'yes'}[reading.stable]
+    print(f"  Parsed weight: {reading.weight} {reading.unit} ({kind}, stable: {stable})")
+    return True
+
+
 def read_response(conn):
     """Read all available bytes from the serial port."""
     time.sleep(0.3)
@@ -69,17 +82,7 @@ def test_gross_weight(conn):
     print(f"  Raw response: {answer!r}")
     print(f"  Decoded:      {answer.decode('ascii', errors='replace').strip()}")
 
-    match = re.search(WEIGHT_RE, answer)
-    if match:
-        weight = float(match.group(1))
-        sign_match = re.search(SIGN_RE, answer)
-        if sign_match:
-            weight = -weight
-        print(f"  Parsed weight: {weight}")
-        return True
-    else:
-        print("  WARNING: No weight match found in response!")
-        return False
+    return report_reading(answer)
 
 
 def test_net_weight(conn):
@@ -90,17 +93,7 @@ def test_net_weight(conn):
     print(f"  Raw response: {answer!r}")
     print(f"  Decoded:      {answer.decode('ascii', errors='replace').strip()}")
 
-    match = re.search(WEIGHT_RE, answer)
-    if match:
-        weight = float(match.group(1))
-        sign_match = re.search(SIGN_RE, answer)
-        if sign_match:
-            weight = -weight
-        print(f"  Parsed weight: {weight}")
-        return True
-    else:
-        print("  WARNING: No weight match found in response!")
-        return False
+    return report_reading(answer)
 
 
 def test_tare(conn):
@@ -139,7 +132,7 @@ def test_probe(conn):
     elif b'N/W' in answer:
         print("  RESULT: CPWplus IDENTIFIED (N/W prefix found)")
         return True
-    elif re.search(rb'[+-]\s*[0-9.]+\s+(?:lb|kg|oz)', answer):
+    elif looks_like_cpwplus(answer):
         print("  RESULT: CPWplus IDENTIFIED (weight response pattern matched)")
         return True
     else:
@@ -155,13 +148,9 @@ def continuous_read(conn, duration=10):
     while time.time() - start < duration:
         conn.write(b'G\r\n')
         answer = read_response(conn)
-        match = re.search(WEIGHT_RE, answer)
-        if match:
-            weight = float(match.group(1))
-            sign_match = re.search(SIGN_RE, answer)
-            if sign_match:
-                weight = -weight
-            print(f"  Weight: {weight:>10.2f}  (raw: {answer.strip()!r})")
+        reading = parse_frame(answer)
+        if reading:
+            print(f"  Weight: {reading.weight:>10.2f}  (raw: {answer.strip()!r})")
         else:
             print(f"  No match   (raw: {answer.strip()!r})")
         time.sleep(0.5)